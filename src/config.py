@@ -12,6 +12,13 @@ CLONE_TIMEOUT = int(os.getenv("GITINGEST_CLONE_TIMEOUT", 300))  # 5 minutes
 REQUEST_TIMEOUT = int(os.getenv("GITINGEST_REQUEST_TIMEOUT", 600))  # 10 minutes
 PROCESSING_TIMEOUT = int(os.getenv("GITINGEST_PROCESSING_TIMEOUT", 480))  # 8 minutes
 
+# Concurrency settings
+MAX_CONCURRENT_CLONES = int(os.getenv("GITINGEST_MAX_CLONES", 4))
+
+# Repository cache settings: when a directory is set, checkouts are created from locally cached mirrors
+REPO_CACHE_PATH = os.getenv("GITINGEST_REPO_CACHE")
+MAX_CACHED_REPOS = int(os.getenv("GITINGEST_MAX_CACHED_REPOS", 32))
+
 # Host settings
 DEFAULT_HOSTS = "gitingest.com,*.gitingest.com,localhost,127.0.0.1"
 ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", DEFAULT_HOSTS).replace(" ", "").split(",")
@@ -20,6 +27,13 @@ MAX_DISPLAY_SIZE: int = 300_000
 TMP_BASE_PATH = Path("/tmp/gitingest")
 DELETE_REPO_AFTER: int = 60 * 60  # In seconds
 
+# Request-scoped clones are only read once and then deleted, so keep them in memory (tmpfs) when available
+SHM_PATH = Path("/dev/shm")
+CLONE_ROOT = Path(
+    os.getenv("GITINGEST_CLONE_ROOT")
+    or (SHM_PATH / "gitingest" if SHM_PATH.is_dir() and os.access(SHM_PATH, os.W_OK) else TMP_BASE_PATH)
+)
+
 EXAMPLE_REPOS: list[dict[str, str]] = [
     {"name": "Gitingest", "url": "https://github.com/cyclotruc/gitingest"},
     {"name": "FastAPI", "url": "https://github.com/tiangolo/fastapi"},
@@ -1,12 +1,20 @@
 """ Functions to ingest and analyze a codebase directory or single file. """
 
-from fnmatch import fnmatch
+import asyncio
+import io
+import os
+import re
+import stat
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from fnmatch import translate
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 import tiktoken
 
-from gitingest.exceptions import AlreadyVisitedError, MaxFileSizeReachedError, MaxFilesReachedError
 from gitingest.notebook_utils import process_notebook
 from config import PROCESSING_TIMEOUT
 from gitingest.utils import async_timeout
@@ -15,78 +23,173 @@ MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 MAX_DIRECTORY_DEPTH = 20  # Maximum depth of directory traversal
 MAX_FILES = 10_000  # Maximum number of files to process
 MAX_TOTAL_SIZE_BYTES = 500 * 1024 * 1024  # 500 MB
+MAX_READ_WORKERS = 32  # Maximum number of threads reading file contents concurrently
+TOKEN_ESTIMATE_THRESHOLD = 5_000_000  # Characters above which tokens are approximated instead of counted
 
+# Bytes that may appear in a text file, deleted from a sample to detect binary content
+_TEXT_CHARS = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)))
 
-def _should_include(path: Path, base_path: Path, include_patterns: list[str]) -> bool:
+
+@dataclass(slots=True)
+class FileNode:
+    """
+    A file found while scanning a directory.
+
+    Attributes
+    ----------
+    name : str
+        The name of the file.
+    path : str
+        The full path of the file.
+    rel_path : str
+        The path of the file relative to the base directory of the query.
+    size : int
+        The size of the file in bytes.
+    content : str | None
+        The content of the file, "[Non-text file]" for binary files, or `None` if it has not been read.
+    """
+
+    name: str
+    path: str
+    rel_path: str
+    size: int
+    content: str | None = None
+
+
+@dataclass(slots=True)
+class DirectoryNode:
+    """
+    A directory found while scanning, together with the aggregated statistics of its contents.
+
+    Attributes
+    ----------
+    name : str
+        The name of the directory.
+    path : str
+        The full path of the directory.
+    rel_path : str
+        The path of the directory relative to the base directory of the query, or "" for the base directory itself.
+    size : int
+        The total size in bytes of all the files below the directory.
+    children : list[FileNode | DirectoryNode]
+        The files and subdirectories directly contained in the directory.
+    file_count : int
+        The total number of files below the directory.
+    dir_count : int
+        The total number of subdirectories below the directory.
+    ignore_content : bool
+        Whether some files of the directory were left out because they did not match the include patterns.
+    """
+
+    name: str
+    path: str
+    rel_path: str
+    size: int = 0
+    children: list["FileNode | DirectoryNode"] = field(default_factory=list)
+    file_count: int = 0
+    dir_count: int = 0
+    ignore_content: bool = False
+
+
+def _compile_patterns(patterns: list[str] | None, skip_empty: bool = True) -> re.Pattern[str] | None:
+    """
+    Compile a list of glob patterns into a single regular expression.
+
+    Each pattern is translated with `fnmatch.translate` and the results are joined into one alternation, so that a
+    path can be checked against every pattern with a single `match` call. Like `fnmatch.fnmatch`, patterns are
+    normalized with `os.path.normcase`, so paths must be normalized the same way before matching.
+
+    Parameters
+    ----------
+    patterns : list[str] | None
+        A list of glob patterns to compile.
+    skip_empty : bool
+        Whether empty patterns are ignored, by default True. Otherwise an empty pattern matches no path.
+
+    Returns
+    -------
+    re.Pattern[str] | None
+        The compiled regular expression, or `None` if there are no patterns to match against.
+    """
+    if not patterns:
+        return None
+
+    translated = [f"(?:{translate(os.path.normcase(pattern))})" for pattern in patterns if pattern or not skip_empty]
+    if not translated:
+        return None
+
+    return re.compile("|".join(translated))
+
+
+def _compile_query_patterns(query: dict[str, Any]) -> None:
+    """
+    Compile the include and ignore patterns of a query and store them on the query.
+
+    The compiled expressions are stored under the `_include_re` and `_ignore_re` keys so that they are computed
+    only once per ingest run instead of once per path.
+
+    Parameters
+    ----------
+    query : dict[str, Any]
+        The query dictionary containing the `include_patterns` and `ignore_patterns` lists.
+    """
+    # An empty include pattern includes nothing, while empty ignore patterns are skipped
+    query["_include_re"] = _compile_patterns(query.get("include_patterns"), skip_empty=False)
+    query["_ignore_re"] = _compile_patterns(query.get("ignore_patterns"))
+
+
+def _should_include(rel_str: str, include_re: re.Pattern[str] | None) -> bool:
     """
     Determine if the given file or directory path matches any of the include patterns.
 
-    This function checks whether the relative path of a file or directory matches any of the specified patterns. If a
+    This function checks whether the relative path of a file or directory matches the compiled include patterns. If a
     match is found, it returns `True`, indicating that the file or directory should be included in further processing.
 
     Parameters
     ----------
-    path : Path
-        The absolute path of the file or directory to check.
-    base_path : Path
-        The base directory from which the relative path is calculated.
-    include_patterns : list[str]
-        A list of patterns to check against the relative path.
+    rel_str : str
+        The path of the file or directory to check, relative to the base directory.
+    include_re : re.Pattern[str] | None
+        The compiled include patterns to check against the relative path.
 
     Returns
     -------
     bool
         `True` if the path matches any of the include patterns, `False` otherwise.
     """
-    try:
-        rel_path = path.relative_to(base_path)
-    except ValueError:
-        # If path is not under base_path at all
+    if include_re is None:
         return False
 
-    rel_str = str(rel_path)
-    for pattern in include_patterns:
-        if fnmatch(rel_str, pattern):
-            return True
-    return False
+    return include_re.match(os.path.normcase(rel_str)) is not None
 
 
-def _should_exclude(path: Path, base_path: Path, ignore_patterns: list[str]) -> bool:
+def _should_exclude(rel_str: str, ignore_re: re.Pattern[str] | None) -> bool:
     """
     Determine if the given file or directory path matches any of the ignore patterns.
 
     This function checks whether the relative path of a file or directory matches
-    any of the specified ignore patterns. If a match is found, it returns `True`, indicating
+    the compiled ignore patterns. If a match is found, it returns `True`, indicating
     that the file or directory should be excluded from further processing.
 
     Parameters
     ----------
-    path : Path
-        The absolute path of the file or directory to check.
-    base_path : Path
-        The base directory from which the relative path is calculated.
-    ignore_patterns : list[str]
-        A list of patterns to check against the relative path.
+    rel_str : str
+        The path of the file or directory to check, relative to the base directory.
+    ignore_re : re.Pattern[str] | None
+        The compiled ignore patterns to check against the relative path.
 
     Returns
     -------
     bool
         `True` if the path matches any of the ignore patterns, `False` otherwise.
     """
-    try:
-        rel_path = path.relative_to(base_path)
-    except ValueError:
-        # If path is not under base_path at all
-        return True
+    if ignore_re is None:
+        return False
 
-    rel_str = str(rel_path)
-    for pattern in ignore_patterns:
-        if pattern and fnmatch(rel_str, pattern):
-            return True
-    return False
+    return ignore_re.match(os.path.normcase(rel_str)) is not None
 
 
-def _is_safe_symlink(symlink_path: Path, base_path: Path) -> bool:
+def _is_safe_symlink(symlink_path: Path, base_resolved: Path) -> bool:
     """
     Check if a symlink points to a location within the base directory.
 
@@ -98,8 +201,8 @@ def _is_safe_symlink(symlink_path: Path, base_path: Path) -> bool:
     ----------
     symlink_path : Path
         The path of the symlink to check.
-    base_path : Path
-        The base directory to ensure the symlink points within.
+    base_resolved : Path
+        The already resolved base directory to ensure the symlink points within.
 
     Returns
     -------
@@ -108,7 +211,6 @@ def _is_safe_symlink(symlink_path: Path, base_path: Path) -> bool:
     """
     try:
         target_path = symlink_path.resolve()
-        base_resolved = base_path.resolve()
         # It's "safe" if target_path == base_resolved or is inside base_resolved
         return base_resolved in target_path.parents or target_path == base_resolved
     except (OSError, ValueError):
@@ -137,12 +239,12 @@ def _is_text_file(file_path: Path) -> bool:
     try:
         with file_path.open("rb") as file:
             chunk = file.read(1024)
-        return not bool(chunk.translate(None, bytes([7, 8, 9, 10, 12, 13, 27] + list(range(0x20, 0x100)))))
+        return not chunk.translate(None, _TEXT_CHARS)
     except OSError:
         return False
 
 
-def _read_file_content(file_path: Path) -> str:
+def _read_file_content(file_path: Path, is_notebook: bool = False) -> str:
     """
     Read the content of a file.
 
@@ -154,6 +256,9 @@ def _read_file_content(file_path: Path) -> str:
     ----------
     file_path : Path
         The path to the file to read.
+    is_notebook : bool
+        Whether the file is a Jupyter notebook that should be converted with `process_notebook`, by default False.
+        Callers decide this from the file name they already hold.
 
     Returns
     -------
@@ -161,16 +266,74 @@ def _read_file_content(file_path: Path) -> str:
         The content of the file, or an error message if the file could not be read.
     """
     try:
-        if file_path.suffix == ".ipynb":
+        if is_notebook:
             return process_notebook(file_path)
 
-        with open(file_path, encoding="utf-8", errors="ignore") as f:
-            return f.read()
+        # Decode the raw bytes in one go rather than going through a `TextIOWrapper`, then translate line endings
+        # as text mode's universal newlines would
+        with open(file_path, "rb") as f:
+            content = f.read().decode("utf-8", errors="ignore")
+        return content.replace("\r\n", "\n").replace("\r", "\n")
     except OSError as e:
         return f"Error reading file: {e}"
 
 
-def _sort_children(children: list[dict[str, Any]]) -> list[dict[str, Any]]:
+def _load_file_content(file_node: FileNode) -> str:
+    """
+    Load the content of a file node for ingestion, or a placeholder if it is not a text file.
+
+    Parameters
+    ----------
+    file_node : FileNode
+        The file node to load.
+
+    Returns
+    -------
+    str
+        The content of the file, or "[Non-text file]" if the file is not a text file.
+    """
+    file_path = Path(file_node.path)
+    if not _is_text_file(file_path):
+        return "[Non-text file]"
+
+    return _read_file_content(file_path, is_notebook=file_node.name.endswith(".ipynb"))
+
+
+def _fill_files_content(node: DirectoryNode, max_file_size: int) -> None:
+    """
+    Read the contents of all files in a scanned directory tree concurrently.
+
+    File reads are I/O-bound and release the GIL, so the reads are spread over a thread pool and the results are
+    written back into the `content` field of each file node. Files larger than `max_file_size` would be dropped from
+    the output anyway, so they are not read at all and their content is left as `None`.
+
+    Parameters
+    ----------
+    node : DirectoryNode
+        The root directory node whose file nodes should be filled in.
+    max_file_size : int
+        The maximum file size in bytes for which content should be read.
+    """
+    file_nodes: list[FileNode] = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        for child in current.children:
+            if isinstance(child, DirectoryNode):
+                stack.append(child)
+            elif child.size <= max_file_size:
+                file_nodes.append(child)
+
+    if not file_nodes:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(file_nodes))) as executor:
+        contents = executor.map(_load_file_content, file_nodes)
+        for file_node, content in zip(file_nodes, contents):
+            file_node.content = content
+
+
+def _sort_children(children: list[FileNode | DirectoryNode]) -> list[FileNode | DirectoryNode]:
     """
     Sort children nodes with:
     1. README.md first
@@ -182,76 +345,69 @@ def _sort_children(children: list[dict[str, Any]]) -> list[dict[str, Any]]:
 
     Parameters
     ----------
-    children : list[dict[str, Any]]
+    children : list[FileNode | DirectoryNode]
         List of file and directory nodes to sort.
 
     Returns
     -------
-    list[dict[str, Any]]
+    list[FileNode | DirectoryNode]
         Sorted list according to the specified order.
     """
-    # Separate files and directories
-    files = [child for child in children if child["type"] == "file"]
-    directories = [child for child in children if child["type"] == "directory"]
+    # A single sort on a composite key instead of partitioning into groups and sorting each one
+    return sorted(children, key=_sort_key)
 
-    # Find README.md
-    readme_files = [f for f in files if f["name"].lower() == "readme.md"]
-    other_files = [f for f in files if f["name"].lower() != "readme.md"]
 
-    # Separate hidden and regular files/directories
-    regular_files = [f for f in other_files if not f["name"].startswith(".")]
-    hidden_files = [f for f in other_files if f["name"].startswith(".")]
-    regular_dirs = [d for d in directories if not d["name"].startswith(".")]
-    hidden_dirs = [d for d in directories if d["name"].startswith(".")]
+def _sort_key(node: FileNode | DirectoryNode) -> tuple[bool, bool, bool, str]:
+    """
+    Build the sort key used by `_sort_children`.
 
-    # Sort each group alphanumerically
-    regular_files.sort(key=lambda x: x["name"])
-    hidden_files.sort(key=lambda x: x["name"])
-    regular_dirs.sort(key=lambda x: x["name"])
-    hidden_dirs.sort(key=lambda x: x["name"])
+    Parameters
+    ----------
+    node : FileNode | DirectoryNode
+        The node to build the key for.
 
-    # Combine all groups in the desired order
-    return readme_files + regular_files + hidden_files + regular_dirs + hidden_dirs
+    Returns
+    -------
+    tuple[bool, bool, bool, str]
+        A tuple ordering README.md first, then files before directories, regular before hidden, and by name.
+    """
+    name = node.name
+    is_dir = isinstance(node, DirectoryNode)
+    is_readme = not is_dir and name.lower() == "readme.md"
+    return (not is_readme, is_dir, name.startswith("."), name)
 
 
-def _scan_directory(
-    path: Path,
-    query: dict[str, Any],
-    seen_paths: set[Path] | None = None,
-    depth: int = 0,
-    stats: dict[str, int] | None = None,
-) -> dict[str, Any] | None:
+def _create_directory_node(
+    path: str,
+    name: str,
+    rel_path: str,
+    seen_paths: set[tuple[int, int]],
+    stats: dict[str, int],
+    depth: int,
+) -> DirectoryNode | None:
     """
-    Recursively analyze a directory and its contents with safety limits.
-
-    This function scans a directory and its subdirectories up to a specified depth. It checks
-    for any file or directory that should be included or excluded based on the provided patterns
-    and limits. It also tracks the number of files and total size processed.
+    Create the node of a directory that is about to be scanned, enforcing the traversal limits.
 
     Parameters
     ----------
-    path : Path
-        The path of the directory to scan.
-    query : dict[str, Any]
-        A dictionary containing the query parameters, such as include and ignore patterns.
-    seen_paths : set[Path] | None, optional
-        A set to track already visited paths, by default None.
+    path : str
+        The path of the directory.
+    name : str
+        The name of the directory.
+    rel_path : str
+        The path of the directory relative to the base directory of the query.
+    seen_paths : set[tuple[int, int]]
+        A set of `(st_dev, st_ino)` pairs of directories that have already been visited.
+    stats : dict[str, int]
+        A dictionary of statistics like the total file count and size.
     depth : int
-        The current depth of directory traversal, by default 0.
-    stats : dict[str, int] | None, optional
-        A dictionary to track statistics such as total file count and size, by default None.
+        The depth of the directory in the traversal.
 
     Returns
     -------
-    dict[str, Any] | None
-        A dictionary representing the directory structure and contents, or `None` if limits are reached.
+    DirectoryNode | None
+        The (still empty) directory node, or `None` if the directory should not be scanned.
     """
-    if seen_paths is None:
-        seen_paths = set()
-
-    if stats is None:
-        stats = {"total_files": 0, "total_size": 0}
-
     if depth > MAX_DIRECTORY_DEPTH:
         print(f"Skipping deep directory: {path} (max depth {MAX_DIRECTORY_DEPTH} reached)")
         return None
@@ -264,271 +420,340 @@ def _scan_directory(
         print(f"Skipping further processing: maximum total size ({MAX_TOTAL_SIZE_BYTES/1024/1024:.1f}MB) reached")
         return None
 
-    real_path = path.resolve()
-    if real_path in seen_paths:
+    path_stat = os.stat(path)
+    path_key = (path_stat.st_dev, path_stat.st_ino)
+    if path_key in seen_paths:
         print(f"Skipping already visited path: {path}")
         return None
 
-    seen_paths.add(real_path)
-
-    result = {
-        "name": path.name,
-        "type": "directory",
-        "size": 0,
-        "children": [],
-        "file_count": 0,
-        "dir_count": 0,
-        "path": str(path),
-        "ignore_content": False,
-    }
+    seen_paths.add(path_key)
+
+    return DirectoryNode(name=name, path=path, rel_path=rel_path)
+
+
+def _finalize_directories(directories: list[DirectoryNode], include_re: re.Pattern[str] | None) -> None:
+    """
+    Aggregate sizes and counts bottom-up, drop empty directories and sort the children of every directory.
+
+    Parameters
+    ----------
+    directories : list[DirectoryNode]
+        The directory nodes in the order they were scanned, so that every directory comes before its subdirectories.
+    include_re : re.Pattern[str] | None
+        The compiled include patterns. When set, subdirectories without any included file are dropped.
+    """
+    for node in reversed(directories):
+        children = []
+        for child in node.children:
+            if isinstance(child, DirectoryNode):
+                if include_re is not None and child.file_count == 0:
+                    continue
+
+                node.size += child.size
+                node.file_count += child.file_count
+                node.dir_count += 1 + child.dir_count
+
+            children.append(child)
 
-    ignore_patterns = query["ignore_patterns"]
+        node.children = _sort_children(children)
+
+
+def _scan_directory(path: Path, query: dict[str, Any]) -> DirectoryNode | None:
+    """
+    Analyze a directory and its contents with safety limits.
+
+    This function scans a directory and its subdirectories up to a specified depth. It checks
+    for any file or directory that should be included or excluded based on the provided patterns
+    and limits. It also tracks the number of files and total size processed. The tree is walked
+    breadth-first using an explicit queue instead of recursion, and symlinked directories are only
+    scanned once all real directories have been, so that a directory is always listed at its real
+    location rather than under a shallower alias. Once the whole tree has been scanned, the contents
+    of the files are read concurrently.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the directory to scan.
+    query : dict[str, Any]
+        A dictionary containing the query parameters, such as include and ignore patterns.
+
+    Returns
+    -------
+    DirectoryNode | None
+        The root node of the directory structure and contents, or `None` if limits are reached.
+    """
+    if "_base_resolved" not in query:
+        query["_base_resolved"] = query["local_path"].resolve()
+    if "_ignore_re" not in query:
+        _compile_query_patterns(query)
+
+    ignore_re = query["_ignore_re"]
     base_path = query["local_path"]
-    include_patterns = query["include_patterns"]
+    include_re = query["_include_re"]
+    root_rel_path = "" if path == base_path else str(path.relative_to(base_path))
 
-    try:
-        for item in path.iterdir():
-            _process_item(
-                item=item,
-                query=query,
-                result=result,
-                seen_paths=seen_paths,
-                stats=stats,
-                depth=depth,
-                ignore_patterns=ignore_patterns,
-                base_path=base_path,
-                include_patterns=include_patterns,
-            )
-    except MaxFilesReachedError:
-        print(f"Maximum file limit ({MAX_FILES}) reached.")
-    except PermissionError:
-        print(f"Permission denied: {path}.")
+    seen_paths: set[tuple[int, int]] = set()
+    stats = {"total_files": 0, "total_size": 0}
+
+    root = _create_directory_node(str(path), path.name, root_rel_path, seen_paths=seen_paths, stats=stats, depth=0)
+    if root is None:
+        return None
 
-    result["children"] = _sort_children(result["children"])
-    return result
+    directories: list[DirectoryNode] = []
+    # Directories are queued by their path string along with their parent node; no `Path` object is built for plain
+    # directories. A node is only attached to its parent once it is scanned, so that directories still queued when
+    # a limit is reached do not show up as empty folders.
+    queue: deque[tuple[str, int, DirectoryNode, DirectoryNode | None]] = deque([(root.path, 0, root, None)])
+    # Symlinked directories, whose target is only claimed in `seen_paths` once the real directories are exhausted
+    symlinked: deque[tuple[DirectoryNode, int, DirectoryNode]] = deque()
+
+    limit_reached = False
+    while not limit_reached:
+        if queue:
+            dir_path, depth, node, parent = queue.popleft()
+        elif symlinked:
+            alias, depth, parent = symlinked.popleft()
+            claimed = _create_directory_node(
+                alias.path, alias.name, alias.rel_path, seen_paths=seen_paths, stats=stats, depth=depth
+            )
+            if claimed is None:
+                continue
+            dir_path, node = claimed.path, claimed
+        else:
+            break
+
+        if parent is not None:
+            parent.children.append(node)
+        directories.append(node)
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    subdir = _process_item(
+                        entry=entry,
+                        query=query,
+                        result=node,
+                        seen_paths=seen_paths,
+                        stats=stats,
+                        depth=depth,
+                        ignore_re=ignore_re,
+                        include_re=include_re,
+                    )
+                    if subdir is not None and entry.is_symlink():
+                        symlinked.append((subdir, depth + 1, node))
+                    elif subdir is not None:
+                        queue.append((subdir.path, depth + 1, subdir, node))
+
+                    if stats["total_files"] >= MAX_FILES:
+                        print(f"Maximum file limit ({MAX_FILES}) reached.")
+                        limit_reached = True
+                        break
+        except PermissionError:
+            print(f"Permission denied: {dir_path}.")
+
+    _finalize_directories(directories, include_re=include_re)
+    _fill_files_content(root, max_file_size=query["max_file_size"])
+
+    return root
 
 
 def _process_symlink(
     item: Path,
+    rel_str: str,
     query: dict[str, Any],
-    result: dict[str, Any],
-    seen_paths: set[Path],
+    result: DirectoryNode,
+    seen_paths: set[tuple[int, int]],
     stats: dict[str, int],
     depth: int,
-    base_path: Path,
-    include_patterns: list[str],
-) -> None:
+) -> DirectoryNode | None:
     """
     Process a symlink in the file system.
 
     This function checks if a symlink is safe, resolves its target, and processes it accordingly.
-    If the symlink is not safe, an exception is raised.
+    Unsafe symlinks, symlinks to already visited directories and symlinks to ignored directories are skipped.
 
     Parameters
     ----------
     item : Path
         The full path of the symlink.
+    rel_str : str
+        The path of the symlink relative to the base directory.
     query : dict[str, Any]
         The query dictionary containing the parameters.
-    result : dict[str, Any]
-        The dictionary to accumulate the results.
-    seen_paths : set[str]
-        A set of already visited paths.
+    result : DirectoryNode
+        The directory node to accumulate the results.
+    seen_paths : set[tuple[int, int]]
+        A set of `(st_dev, st_ino)` pairs of already visited directories.
     stats : dict[str, int]
         The dictionary to track statistics such as file count and size.
     depth : int
         The current depth in the directory traversal.
-    base_path : Path
-        The base path used for validation of the symlink.
-    include_patterns : list[str]
-        A list of include patterns for file filtering.
 
-    Raises
-    ------
-    AlreadyVisitedError
-        If the symlink has already been processed.
-    MaxFileSizeReachedError
-        If the file size exceeds the maximum limit.
-    MaxFilesReachedError
-        If the number of files exceeds the maximum limit.
-    """
-    if not _is_safe_symlink(item, base_path):
-        raise AlreadyVisitedError(str(item))
-
-    real_path = item.resolve()
-    if real_path in seen_paths:
-        raise AlreadyVisitedError(str(item))
-
-    if real_path.is_file():
-        file_size = real_path.stat().st_size
-        if stats["total_size"] + file_size > MAX_TOTAL_SIZE_BYTES:
-            raise MaxFileSizeReachedError(MAX_TOTAL_SIZE_BYTES)
-
-        stats["total_files"] += 1
-        stats["total_size"] += file_size
-
-        if stats["total_files"] > MAX_FILES:
-            print(f"Maximum file limit ({MAX_FILES}) reached")
-            raise MaxFilesReachedError(MAX_FILES)
-
-        is_text = _is_text_file(real_path)
-        content = _read_file_content(real_path) if is_text else "[Non-text file]"
-
-        child = {
-            "name": item.name,
-            "type": "file",
-            "size": file_size,
-            "content": content,
-            "path": str(item),
-        }
-        result["children"].append(child)
-        result["size"] += file_size
-        result["file_count"] += 1
-
-    elif real_path.is_dir():
-        subdir = _scan_directory(
-            path=real_path,
-            query=query,
-            seen_paths=seen_paths,
-            depth=depth + 1,
-            stats=stats,
-        )
-        if subdir and (not include_patterns or subdir["file_count"] > 0):
-            # rename the subdir to reflect the symlink name
-            subdir["name"] = item.name
-            subdir["path"] = str(item)
-            result["children"].append(subdir)
-            result["size"] += subdir["size"]
-            result["file_count"] += subdir["file_count"]
-            result["dir_count"] += 1 + subdir["dir_count"]
+    Returns
+    -------
+    DirectoryNode | None
+        The (unclaimed) node of the directory the symlink points to if it may be scanned, `None` otherwise. The
+        caller scans it after all real directories, and only if its target has not been visited by then.
+    """
+    if not _is_safe_symlink(item, query["_base_resolved"]):
+        print(f"Skipping symlink pointing outside of the base directory: {item}")
+        return None
 
+    try:
+        target_stat = os.stat(item)
+    except OSError:
+        # Broken symlink
+        return None
 
-def _process_file(item: Path, result: dict[str, Any], stats: dict[str, int]) -> None:
+    if (target_stat.st_dev, target_stat.st_ino) in seen_paths:
+        print(f"Symlink target already visited: {item}")
+        return None
+
+    if stat.S_ISREG(target_stat.st_mode):
+        _add_file(FileNode(name=item.name, path=str(item), rel_path=rel_str, size=target_stat.st_size), result, stats)
+
+    elif stat.S_ISDIR(target_stat.st_mode):
+        # The alias is only scanned when its target is not listed anywhere else, and then under the alias path like
+        # a symlinked file, so that the tree and the file headers agree. A directory ignored at its real location
+        # must not come back through an alias.
+        real_rel_path = str(item.resolve().relative_to(query["_base_resolved"]))
+        if real_rel_path and _should_exclude(real_rel_path, query["_ignore_re"]):
+            return None
+
+        return DirectoryNode(name=item.name, path=str(item), rel_path=rel_str)
+
+    return None
+
+
+def _add_file(file_node: FileNode, result: DirectoryNode, stats: dict[str, int]) -> None:
     """
-    Process a file in the file system.
+    Add a file to its directory node and update the statistics, unless it would exceed the total size limit.
 
-    This function checks the file's size, increments the statistics, and reads its content.
-    If the file size exceeds the maximum allowed, it raises an error.
+    The file limit is not checked here: the scanning loop checks it after every entry and stops the whole walk,
+    so that no exception has to be raised to unwind the traversal.
 
     Parameters
     ----------
-    item : Path
-        The full path of the file.
-    result : dict[str, Any]
-        The dictionary to accumulate the results.
+    file_node : FileNode
+        The node of the file to add. Its content is filled in once the scan is complete.
+    result : DirectoryNode
+        The directory node to accumulate the results.
     stats : dict[str, int]
         The dictionary to track statistics such as file count and size.
-
-    Raises
-    ------
-    MaxFileSizeReachedError
-        If the file size exceeds the maximum limit.
-    MaxFilesReachedError
-        If the number of files exceeds the maximum limit.
     """
-    file_size = item.stat().st_size
-    if stats["total_size"] + file_size > MAX_TOTAL_SIZE_BYTES:
-        print(f"Skipping file {item}: would exceed total size limit")
-        raise MaxFileSizeReachedError(MAX_TOTAL_SIZE_BYTES)
+    if stats["total_size"] + file_node.size > MAX_TOTAL_SIZE_BYTES:
+        print(f"Skipping file {file_node.path}: would exceed total size limit")
+        return
 
     stats["total_files"] += 1
-    stats["total_size"] += file_size
+    stats["total_size"] += file_node.size
 
-    if stats["total_files"] > MAX_FILES:
-        print(f"Maximum file limit ({MAX_FILES}) reached")
-        raise MaxFilesReachedError(MAX_FILES)
+    result.children.append(file_node)
+    result.size += file_node.size
+    result.file_count += 1
 
-    is_text = _is_text_file(item)
-    content = _read_file_content(item) if is_text else "[Non-text file]"
 
-    child = {
-        "name": item.name,
-        "type": "file",
-        "size": file_size,
-        "content": content,
-        "path": str(item),
-    }
-    result["children"].append(child)
-    result["size"] += file_size
-    result["file_count"] += 1
+def _process_file(entry: os.DirEntry[str], rel_str: str, result: DirectoryNode, stats: dict[str, int]) -> None:
+    """
+    Process a file in the file system.
+
+    This function checks the file's size and increments the statistics. The content is read later,
+    once the scan is complete. Files that would exceed the total size limit are skipped.
+
+    Parameters
+    ----------
+    entry : os.DirEntry[str]
+        The directory entry of the file, as yielded by `os.scandir`.
+    rel_str : str
+        The path of the file relative to the base directory.
+    result : DirectoryNode
+        The directory node to accumulate the results.
+    stats : dict[str, int]
+        The dictionary to track statistics such as file count and size.
+    """
+    file_size = entry.stat(follow_symlinks=False).st_size
+    _add_file(FileNode(name=entry.name, path=entry.path, rel_path=rel_str, size=file_size), result, stats)
 
 
 def _process_item(
-    item: Path,
+    entry: os.DirEntry[str],
     query: dict[str, Any],
-    result: dict[str, Any],
-    seen_paths: set[Path],
+    result: DirectoryNode,
+    seen_paths: set[tuple[int, int]],
     stats: dict[str, int],
     depth: int,
-    ignore_patterns: list[str],
-    base_path: Path,
-    include_patterns: list[str],
-) -> None:
+    ignore_re: re.Pattern[str] | None,
+    include_re: re.Pattern[str] | None,
+) -> DirectoryNode | None:
     """
     Process a file or directory item within a directory.
 
     This function handles each file or directory item, checking if it should be included or excluded based on the
-    provided patterns. It handles symlinks, directories, and files accordingly.
+    provided patterns. Files are added to the result directly, while directories (and symlinks to directories) are
+    returned to the caller so that they can be queued for scanning.
 
     Parameters
     ----------
-    item : Path
-        The full path of the file or directory to process.
+    entry : os.DirEntry[str]
+        The directory entry of the file or directory to process, as yielded by `os.scandir`.
     query : dict[str, Any]
         A dictionary of query parameters, including the base path and patterns.
-    result : dict[str, Any]
-        The result dictionary to accumulate processed file/directory data.
-    seen_paths : set[Path]
-        A set of paths that have already been visited.
+    result : DirectoryNode
+        The directory node to accumulate processed file/directory data.
+    seen_paths : set[tuple[int, int]]
+        A set of `(st_dev, st_ino)` pairs of directories that have already been visited.
     stats : dict[str, int]
         A dictionary of statistics like the total file count and size.
     depth : int
         The current depth of directory traversal.
-    ignore_patterns : list[str]
-        A list of patterns to exclude files or directories.
-    base_path : Path
-        The base directory used for relative path calculations.
-    include_patterns : list[str]
-        A list of patterns to include files or directories.
-    """
-    if _should_exclude(item, base_path, ignore_patterns):
-        return
+    ignore_re : re.Pattern[str] | None
+        The compiled patterns to exclude files or directories.
+    include_re : re.Pattern[str] | None
+        The compiled patterns to include files or directories.
 
-    if item.is_file() and query["include_patterns"] and not _should_include(item, base_path, include_patterns):
-        result["ignore_content"] = True
-        return
+    Returns
+    -------
+    DirectoryNode | None
+        The node of a subdirectory to scan, or `None` if there is nothing to descend into.
+    """
+    # Derive the relative path from the parent's instead of calling `Path.relative_to` for every entry
+    rel_str = f"{result.rel_path}{os.sep}{entry.name}" if result.rel_path else entry.name
+    if _should_exclude(rel_str, ignore_re):
+        return None
 
-    try:
-        if item.is_symlink():
-            _process_symlink(
-                item=item,
-                query=query,
-                result=result,
-                seen_paths=seen_paths,
-                stats=stats,
-                depth=depth,
-                base_path=base_path,
-                include_patterns=include_patterns,
-            )
+    # Query the entry type once. `DirEntry` takes it from the `readdir` result where possible, and symlinks are
+    # handled before anything else, so `is_file` (which follows links) only describes regular files past that point.
+    is_symlink = entry.is_symlink()
+    is_file = entry.is_file()
 
-        if item.is_file():
-            _process_file(item=item, result=result, stats=stats)
+    # Without include patterns (the common case) the include check is skipped entirely.
+    if include_re is not None and is_file and not _should_include(rel_str, include_re):
+        result.ignore_content = True
+        return None
 
-        elif item.is_dir():
-            subdir = _scan_directory(path=item, query=query, seen_paths=seen_paths, depth=depth + 1, stats=stats)
-            if subdir and (not include_patterns or subdir["file_count"] > 0):
-                result["children"].append(subdir)
-                result["size"] += subdir["size"]
-                result["file_count"] += subdir["file_count"]
-                result["dir_count"] += 1 + subdir["dir_count"]
+    if is_symlink:
+        return _process_symlink(
+            item=Path(entry.path),
+            rel_str=rel_str,
+            query=query,
+            result=result,
+            seen_paths=seen_paths,
+            stats=stats,
+            depth=depth,
+        )
+
+    if is_file:
+        _process_file(entry=entry, rel_str=rel_str, result=result, stats=stats)
+
+    elif entry.is_dir(follow_symlinks=False):
+        return _create_directory_node(
+            entry.path, entry.name, rel_str, seen_paths=seen_paths, stats=stats, depth=depth + 1
+        )
 
-    except (MaxFileSizeReachedError, AlreadyVisitedError) as e:
-        print(e)
+    return None
 
 
 def _extract_files_content(
-    query: dict[str, Any],
-    node: dict[str, Any],
+    node: FileNode | DirectoryNode,
     max_file_size: int,
     files: list[dict[str, Any]] | None = None,
 ) -> list[dict[str, Any]]:
@@ -540,9 +765,7 @@ def _extract_files_content(
 
     Parameters
     ----------
-    query : dict[str, Any]
-        A dictionary containing the query parameters, including the base path of the repository.
-    node : dict[str, Any]
+    node : FileNode | DirectoryNode
         The current directory or file node being processed.
     max_file_size : int
         The maximum file size in bytes for which content should be extracted.
@@ -557,24 +780,25 @@ def _extract_files_content(
     if files is None:
         files = []
 
-    if node["type"] == "file" and node["content"] != "[Non-text file]":
-        if node["size"] > max_file_size:
+    if isinstance(node, FileNode):
+        if node.content == "[Non-text file]":
+            return files
+
+        if node.size > max_file_size:
             content = None
         else:
-            content = node["content"]
-
-        relative_path = Path(node["path"]).relative_to(query["local_path"])
+            content = node.content
 
         files.append(
             {
-                "path": str(relative_path),
+                "path": node.rel_path,
                 "content": content,
-                "size": node["size"],
+                "size": node.size,
             },
         )
-    elif node["type"] == "directory":
-        for child in node["children"]:
-            _extract_files_content(query=query, node=child, max_file_size=max_file_size, files=files)
+    else:
+        for child in node.children:
+            _extract_files_content(node=child, max_file_size=max_file_size, files=files)
 
     return files
 
@@ -596,7 +820,7 @@ def _create_file_content_string(files: list[dict[str, Any]]) -> str:
     str
         A formatted string representing the contents of all the files with appropriate separators.
     """
-    output = ""
+    output = io.StringIO()
     separator = "=" * 48 + "\n"
 
     # Then add all other files in their original order
@@ -604,15 +828,16 @@ def _create_file_content_string(files: list[dict[str, Any]]) -> str:
         if not file["content"]:
             continue
 
-        output += separator
-        output += f"File: {file['path']}\n"
-        output += separator
-        output += f"{file['content']}\n\n"
+        output.write(separator)
+        output.write(f"File: {file['path']}\n")
+        output.write(separator)
+        output.write(file["content"])
+        output.write("\n\n")
 
-    return output
+    return output.getvalue()
 
 
-def _create_summary_string(query: dict[str, Any], nodes: dict[str, Any]) -> str:
+def _create_summary_string(query: dict[str, Any], nodes: DirectoryNode) -> str:
     """
     Create a summary string with file counts and content size.
 
@@ -623,8 +848,8 @@ def _create_summary_string(query: dict[str, Any], nodes: dict[str, Any]) -> str:
     ----------
     query : dict[str, Any]
         Dictionary containing query parameters like repository name, commit, branch, and subpath.
-    nodes : dict[str, Any]
-        Dictionary representing the directory structure, including file and directory counts.
+    nodes : DirectoryNode
+        The root node of the directory structure, including file and directory counts.
 
     Returns
     -------
@@ -636,7 +861,7 @@ def _create_summary_string(query: dict[str, Any], nodes: dict[str, Any]) -> str:
     else:
         summary = f"Repository: {query['slug']}\n"
 
-    summary += f"Files analyzed: {nodes['file_count']}\n"
+    summary += f"Files analyzed: {nodes.file_count}\n"
 
     if "subpath" in query and query["subpath"] != "/":
         summary += f"Subpath: {query['subpath']}\n"
@@ -648,18 +873,24 @@ def _create_summary_string(query: dict[str, Any], nodes: dict[str, Any]) -> str:
     return summary
 
 
-def _create_tree_structure(query: dict[str, Any], node: dict[str, Any], prefix: str = "", is_last: bool = True) -> str:
+def _create_tree_structure(
+    query: dict[str, Any],
+    node: FileNode | DirectoryNode,
+    prefix: str = "",
+    is_last: bool = True,
+) -> str:
     """
     Create a tree-like string representation of the file structure.
 
     This function generates a string representation of the directory structure, formatted
-    as a tree with appropriate indentation for nested directories and files.
+    as a tree with appropriate indentation for nested directories and files. The tree is walked
+    with an explicit stack and the lines are joined once at the end.
 
     Parameters
     ----------
     query : dict[str, Any]
         A dictionary containing query parameters like repository name and subpath.
-    node : dict[str, Any]
+    node : FileNode | DirectoryNode
         The current directory or file node being processed.
     prefix : str
         A string used for indentation and formatting of the tree structure, by default "".
@@ -671,24 +902,45 @@ def _create_tree_structure(query: dict[str, Any], node: dict[str, Any], prefix:
     str
         A string representing the directory structure formatted as a tree.
     """
-    tree = ""
+    if not node.name:
+        node.name = query["slug"]
 
-    if not node["name"]:
-        node["name"] = query["slug"]
+    parts: list[str] = []
+    stack = [(node, prefix, is_last)]
+    while stack:
+        current, current_prefix, current_is_last = stack.pop()
+        is_directory = isinstance(current, DirectoryNode)
 
-    if node["name"]:
-        current_prefix = "└── " if is_last else "├── "
-        name = node["name"] + "/" if node["type"] == "directory" else node["name"]
-        tree += prefix + current_prefix + name + "\n"
+        if current.name:
+            parts.append(current_prefix)
+            parts.append("└── " if current_is_last else "├── ")
+            parts.append(current.name + "/\n" if is_directory else current.name + "\n")
 
-    if node["type"] == "directory":
-        # Adjust prefix only if we added a node name
-        new_prefix = prefix + ("    " if is_last else "│   ") if node["name"] else prefix
-        children = node["children"]
-        for i, child in enumerate(children):
-            tree += _create_tree_structure(query, child, new_prefix, i == len(children) - 1)
+        if is_directory:
+            # Adjust prefix only if we added a node name
+            new_prefix = current_prefix + ("    " if current_is_last else "│   ") if current.name else current_prefix
+            children = current.children
+            # Push in reverse so that children are emitted in their sorted order
+            for i in range(len(children) - 1, -1, -1):
+                stack.append((children[i], new_prefix, i == len(children) - 1))
 
-    return tree
+    return "".join(parts)
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> tiktoken.Encoding:
+    """
+    Return the `tiktoken` encoding used to estimate token counts.
+
+    The encoding is loaded lazily on first use, since loading it reads (and possibly downloads) the BPE ranks, and
+    is then reused for every subsequent estimation.
+
+    Returns
+    -------
+    tiktoken.Encoding
+        The `cl100k_base` encoding.
+    """
+    return tiktoken.get_encoding("cl100k_base")
 
 
 def _generate_token_string(context_string: str) -> str | None:
@@ -697,6 +949,8 @@ def _generate_token_string(context_string: str) -> str | None:
 
     This function estimates the number of tokens in a given text string using the `tiktoken`
     library. It returns the number of tokens in a human-readable format (e.g., '1.2k', '1.2M').
+    Strings longer than `TOKEN_ESTIMATE_THRESHOLD` characters are not encoded; their token count
+    is approximated as one token per four characters instead.
 
     Parameters
     ----------
@@ -708,12 +962,14 @@ def _generate_token_string(context_string: str) -> str | None:
     str | None
         The formatted number of tokens as a string (e.g., '1.2k', '1.2M'), or `None` if an error occurs.
     """
-    try:
-        encoding = tiktoken.get_encoding("cl100k_base")
-        total_tokens = len(encoding.encode(context_string, disallowed_special=()))
-    except (ValueError, UnicodeEncodeError) as e:
-        print(e)
-        return None
+    if len(context_string) > TOKEN_ESTIMATE_THRESHOLD:
+        total_tokens = len(context_string) // 4
+    else:
+        try:
+            total_tokens = len(_get_encoding().encode(context_string, disallowed_special=()))
+        except (ValueError, UnicodeEncodeError) as e:
+            print(e)
+            return None
 
     if total_tokens > 1_000_000:
         return f"{total_tokens / 1_000_000:.1f}M"
@@ -758,7 +1014,7 @@ def _ingest_single_file(path: Path, query: dict[str, Any]) -> tuple[str, str, st
     if file_size > query["max_file_size"]:
         content = "[Content ignored: file too large]"
     else:
-        content = _read_file_content(path)
+        content = _read_file_content(path, is_notebook=path.name.endswith(".ipynb"))
 
     relative_path = path.relative_to(query["local_path"])
 
@@ -813,7 +1069,7 @@ def _ingest_directory(path: Path, query: dict[str, Any]) -> tuple[str, str, str]
     if not nodes:
         raise ValueError(f"No files found in {path}")
 
-    files = _extract_files_content(query=query, node=nodes, max_file_size=query["max_file_size"])
+    files = _extract_files_content(node=nodes, max_file_size=query["max_file_size"])
     summary = _create_summary_string(query, nodes)
     tree = "Directory structure:\n" + _create_tree_structure(query, nodes)
     files_content = _create_file_content_string(files)
@@ -832,6 +1088,8 @@ async def run_ingest_query(query: dict[str, Any]) -> tuple[str, str, str]:
 
     This function processes a file or directory based on the provided query, extracting its contents
     and generating a summary, directory structure, and file content, along with token estimations.
+    The blocking file system traversal and token counting run in a worker thread so that the event
+    loop is not blocked while a large codebase is being ingested.
 
     Parameters
     ----------
@@ -852,7 +1110,11 @@ async def run_ingest_query(query: dict[str, Any]) -> tuple[str, str, str]:
     if not path.exists():
         raise ValueError(f"{query['slug']} cannot be found")
 
+    _compile_query_patterns(query)
+    # The base never changes during an ingest, so resolve it once for all symlink safety checks
+    query["_base_resolved"] = query["local_path"].resolve()
+
     if query.get("type") == "blob":
-        return _ingest_single_file(path, query)
+        return await asyncio.to_thread(_ingest_single_file, path, query)
 
-    return _ingest_directory(path, query)
+    return await asyncio.to_thread(_ingest_directory, path, query)
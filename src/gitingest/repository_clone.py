@@ -1,20 +1,96 @@
 """ This module contains functions for cloning a Git repository to a local path. """
 
 import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Callable, Optional
 
+import httpx
+
 from gitingest.utils import async_timeout
-from config import CLONE_TIMEOUT
+from config import CLONE_TIMEOUT, MAX_CACHED_REPOS, MAX_CONCURRENT_CLONES, REPO_CACHE_PATH
 
+REPO_CHECK_TIMEOUT = 5  # Seconds
+MAX_REPO_CHECK_CONNECTIONS = 64
+REPO_EXISTS_CACHE_TTL = 600  # Seconds
+REPO_MISSING_CACHE_TTL = 60  # Seconds
+MAX_REPO_CHECK_CACHE_SIZE = 1024
+MAX_PARALLEL_REPO_CHECKS = 20
 
-@dataclass
+# git's stderr output when the remote repository does not exist (or is private): GitHub's own message, the
+# credentials prompt refused because of GIT_TERMINAL_PROMPT=0, and git's errors for an HTTP 404
+_REPO_NOT_FOUND_RE = re.compile(
+    rb"Repository not found|could not read Username|The requested URL returned error: 404|repository '[^']*' not found"
+)
+
+# Repository URLs on hosts whose HEAD answer says little (private repositories redirect to a 200 login page) and
+# whose git errors are matched by `_REPO_NOT_FOUND_RE`, so they are not checked over HTTP before cloning
+_KNOWN_HOST_URL_RE = re.compile(r"^https://(?:github\.com|gitlab\.com|bitbucket\.org)/[\w.-]+/[\w.-]+/?$")
+
+# Progress lines such as "Receiving objects:  67% (910/1363)", which git separates with carriage returns
+_PROGRESS_RE = re.compile(rb"Receiving objects:\s+(\d+)% \((\d+)/(\d+)\)")
+_STDERR_CHUNK_SIZE = 4096
+_PROGRESS_TAIL_SIZE = 256  # Bytes of unmatched output carried over to catch lines split between chunks
+
+# Absolute path of git: together with `close_fds=False` it lets CPython spawn git with `posix_spawn` instead of
+# forking the (possibly large) server process
+_GIT_EXECUTABLE = shutil.which("git") or "git"
+
+# URL -> (exists, expiry on the `time.monotonic` clock)
+_repo_exists_cache: dict[str, tuple[bool, float]] = {}
+
+# (url, revision) -> future resolving to the local path of the clone in progress
+_inflight_clones: dict[tuple[str, str], asyncio.Future[str]] = {}
+
+# Bounds the number of git processes running at once; further commands wait for a free slot
+_clone_semaphore: asyncio.Semaphore | None = None
+_clone_semaphore_loop: asyncio.AbstractEventLoop | None = None
+
+_http_client: httpx.AsyncClient | None = None
+_http_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+@dataclass(slots=True)
 class CloneProgress:
     """克隆进度信息"""
+
     phase: str
     current: int = 0
     total: int = 0
-    message: str = ""
+
+    @property
+    def message(self) -> str:
+        """
+        Describe the progress for display, based on the number of objects received.
+
+        Returns
+        -------
+        str
+            The percentage of objects received, or an empty string while the total is unknown.
+        """
+        if not self.total:
+            return ""
+        return f"接收对象: {self.current * 100 // self.total}%"
+
+    def to_json(self) -> str:
+        """
+        Serialize the progress to JSON.
+
+        Returns
+        -------
+        str
+            The progress as a JSON object with the `phase`, `current`, `total` and `message` keys.
+        """
+        return json.dumps({"phase": self.phase, "current": self.current, "total": self.total, "message": self.message})
 
 
 @dataclass
@@ -37,6 +113,10 @@ class CloneConfig:
         The branch to clone (default is None).
     progress_callback : Callable[[CloneProgress], None] | None, optional
         The callback function to update the progress of the cloning process.
+    verify_exists : bool, optional
+        Whether to check that the repository exists with an HTTP request before cloning (default is False).
+        When disabled, or for repositories on GitHub, GitLab and Bitbucket, a missing repository is detected from the
+        output of `git clone` instead.
     """
 
     url: str
@@ -44,6 +124,7 @@ class CloneConfig:
     commit: Optional[str] = None
     branch: Optional[str] = None
     progress_callback: Optional[Callable[[CloneProgress], None]] = None
+    verify_exists: bool = False
 
 
 @async_timeout(CLONE_TIMEOUT)
@@ -86,14 +167,192 @@ async def clone_repo(config: CloneConfig) -> tuple[bytes, bytes]:
     if not local_path:
         raise ValueError("The 'local_path' parameter is required.")
 
-    # Check if the repository exists
-    if not await _check_repo_exists(url):
+    # Check if the repository exists. By default this is left to `git clone`, which saves a round-trip on success.
+    if config.verify_exists and not _KNOWN_HOST_URL_RE.match(url) and not await _check_repo_exists(url):
         raise ValueError("Repository not found, make sure it is public")
 
+    # If the same revision of the repository is already being cloned, wait for that clone and copy it
+    key = (url, commit or branch or "HEAD")
+    inflight = _inflight_clones.get(key)
+    if inflight is not None:
+        try:
+            source_path = await asyncio.shield(inflight)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # The other clone failed: clone on our own, which reports the error if there is one
+            source_path = None
+
+        if source_path is not None:
+            try:
+                await asyncio.to_thread(shutil.copytree, source_path, local_path, symlinks=True, copy_function=os.link)
+                return b"", b""
+            except OSError:
+                # The files cannot be linked (e.g. different filesystem or already deleted): clone on our own
+                await asyncio.to_thread(shutil.rmtree, local_path, ignore_errors=True)
+
+    future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+    _inflight_clones[key] = future
+    try:
+        result = await _clone(config)
+    except BaseException as exc:
+        future.set_exception(exc if isinstance(exc, Exception) else RuntimeError("The clone was interrupted"))
+        # Mark the exception as retrieved, there may be no other caller waiting for it
+        future.exception()
+        raise
+    finally:
+        if _inflight_clones.get(key) is future:
+            del _inflight_clones[key]
+
+    future.set_result(local_path)
+    return result
+
+
+@asynccontextmanager
+async def cloned_repo(config: CloneConfig) -> AsyncIterator[Path]:
+    """
+    Clone a repository for the duration of a `async with` block and delete it afterwards.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The configuration of the clone, see `clone_repo`.
+
+    Yields
+    ------
+    Path
+        The local path of the cloned repository.
+    """
+    try:
+        await clone_repo(config)
+        yield Path(config.local_path)
+    finally:
+        await asyncio.to_thread(shutil.rmtree, config.local_path, ignore_errors=True)
+
+
+class RepoCache:
+    """
+    A cache of bare mirrors of remote repositories, from which per-request checkouts are created as worktrees.
+
+    The first request for a repository clones a blobless mirror; later requests only fetch what changed since and
+    check out the requested revision locally with `git worktree add`. The least recently used mirrors are deleted
+    once more than `max_repos` are cached.
+
+    Parameters
+    ----------
+    root : Path
+        The directory holding the mirrors.
+    max_repos : int
+        The maximum number of mirrors to keep, by default `MAX_CACHED_REPOS`.
+    """
+
+    def __init__(self, root: Path, max_repos: int = MAX_CACHED_REPOS) -> None:
+        self.root = root
+        self.max_repos = max_repos
+        self._locks: dict[str, asyncio.Lock] = {}
+        # Mirror keys from least to most recently used, starting with the mirrors left by a previous run
+        self._lru: dict[str, None] = {}
+        if root.is_dir():
+            for mirror in sorted(root.glob("*.git"), key=lambda mirror: mirror.stat().st_mtime):
+                self._lru[mirror.stem] = None
+
+    async def worktree(self, config: CloneConfig) -> tuple[bytes, bytes]:
+        """
+        Check out the configured revision of a repository to its local path from the cached mirror.
+
+        Parameters
+        ----------
+        config : CloneConfig
+            The configuration of the clone.
+
+        Returns
+        -------
+        tuple[bytes, bytes]
+            A tuple containing the stdout and stderr of the `git worktree add` command.
+        """
+        key = hashlib.sha1(config.url.encode()).hexdigest()
+        mirror = str(self.root / f"{key}.git")
+
+        # Commands on the same mirror must not overlap
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if Path(mirror).is_dir():
+                await _run_git_command("git", "-C", mirror, "fetch", "--prune", config=config)
+                # Forget the worktrees of earlier requests that have been deleted since
+                await _run_git_command("git", "-C", mirror, "worktree", "prune", config=config)
+            else:
+                self.root.mkdir(parents=True, exist_ok=True)
+                clone_cmd = ["git", "-c", "protocol.version=2", "clone", "--mirror", "--filter=blob:none"]
+                await _run_git_command(*clone_cmd, config.url, mirror, config=config)
+
+            ref = config.commit or config.branch or "HEAD"
+            result = await _run_git_command(
+                "git", "-C", mirror, "worktree", "add", "--detach", config.local_path, ref, config=config
+            )
+
+        self._lru.pop(key, None)
+        self._lru[key] = None
+        await self._evict()
+        return result
+
+    async def _evict(self) -> None:
+        """
+        Delete the least recently used mirrors until at most `max_repos` are left, skipping mirrors in use.
+        """
+        for key in list(self._lru):
+            if len(self._lru) <= self.max_repos:
+                break
+
+            lock = self._locks.get(key)
+            if lock is not None and lock.locked():
+                continue
+
+            del self._lru[key]
+            self._locks.pop(key, None)
+
+            # Move the mirror out of the way before the (slow) deletion, so that a request for the same repository
+            # arriving meanwhile clones a new mirror instead of fetching into a half-deleted one
+            trash = self.root / f"{key}.{uuid.uuid4().hex}.evicted"
+            try:
+                os.rename(self.root / f"{key}.git", trash)
+            except FileNotFoundError:
+                continue
+
+            await asyncio.to_thread(shutil.rmtree, trash, ignore_errors=True)
+
+
+# Checkouts are only made from cached mirrors when a cache directory is configured
+_repo_cache = RepoCache(Path(REPO_CACHE_PATH)) if REPO_CACHE_PATH else None
+
+
+async def _clone(config: CloneConfig) -> tuple[bytes, bytes]:
+    """
+    Run the git commands cloning a repository according to the provided configuration.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The validated configuration of the clone.
+
+    Returns
+    -------
+    tuple[bytes, bytes]
+        A tuple containing the stdout and stderr of the last git command executed.
+    """
+    if _repo_cache is not None:
+        return await _repo_cache.worktree(config)
+
+    url: str = config.url
+    local_path: str = config.local_path
+    commit: str | None = config.commit
+    branch: str | None = config.branch
+
+    # Protocol v2 keeps the ref negotiation small. git only reports progress on a pipe when asked with `--progress`.
+    git_clone = ["git", "-c", "protocol.version=2", "clone"]
+    if config.progress_callback:
+        git_clone.append("--progress")
+
     if commit:
         # Scenario 1: Clone and checkout a specific commit
-        # Clone the repository without depth to ensure full history for checkout
-        clone_cmd = ["git", "clone", "--single-branch", url, local_path]
+        # Clone the full history, but without any blobs: only those of the checked out commit are fetched
+        clone_cmd = [*git_clone, "--filter=blob:none", "--no-checkout", "--single-branch", url, local_path]
         await _run_git_command(*clone_cmd, config=config)
 
         # Checkout the specific commit
@@ -103,11 +362,11 @@ async def clone_repo(config: CloneConfig) -> tuple[bytes, bytes]:
     if branch and branch.lower() not in ("main", "master"):
 
         # Scenario 2: Clone a specific branch with shallow depth
-        clone_cmd = ["git", "clone", "--depth=1", "--single-branch", "--branch", branch, url, local_path]
+        clone_cmd = [*git_clone, "--depth=1", "--single-branch", "--branch", branch, url, local_path]
         return await _run_git_command(*clone_cmd, config=config)
 
     # Scenario 3: Clone the default branch with shallow depth
-    clone_cmd = ["git", "clone", "--depth=1", "--single-branch", url, local_path]
+    clone_cmd = [*git_clone, "--depth=1", "--single-branch", url, local_path]
     return await _run_git_command(*clone_cmd, config=config)
 
 
@@ -115,6 +374,10 @@ async def _check_repo_exists(url: str) -> bool:
     """
     Check if a repository exists at the given URL using an HTTP HEAD request.
 
+    The request is sent in-process through a shared `httpx.AsyncClient`, so no `curl` process is spawned and
+    connections to the same host are reused between checks. Answers are cached per URL, for a shorter time when the
+    repository was not found; failed requests are not cached.
+
     Parameters
     ----------
     url : str
@@ -125,22 +388,94 @@ async def _check_repo_exists(url: str) -> bool:
     bool
         True if the repository exists, False otherwise.
     """
-    proc = await asyncio.create_subprocess_exec(
-        "curl",
-        "-I",
-        url,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    stdout, _ = await proc.communicate()
-    if proc.returncode != 0:
+    now = time.monotonic()
+    cached = _repo_exists_cache.get(url)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    try:
+        response = await _get_http_client().head(url)
+    except httpx.HTTPError:
         return False
-    # Check if stdout contains "404" status code
-    stdout_str = stdout.decode()
-    return "HTTP/1.1 404" not in stdout_str and "HTTP/2 404" not in stdout_str
 
+    exists = response.status_code != 404
+    ttl = REPO_EXISTS_CACHE_TTL if exists else REPO_MISSING_CACHE_TTL
+
+    # Re-insert so that the dict stays ordered by insertion time and the oldest entry can be evicted first
+    _repo_exists_cache.pop(url, None)
+    if len(_repo_exists_cache) >= MAX_REPO_CHECK_CACHE_SIZE:
+        del _repo_exists_cache[next(iter(_repo_exists_cache))]
+    _repo_exists_cache[url] = (exists, now + ttl)
 
-async def _run_git_command(*args: str, config: CloneConfig) -> tuple[bytes, bytes]:
+    return exists
+
+
+async def check_many(urls: list[str]) -> list[bool]:
+    """
+    Check whether several repositories exist, sending the requests concurrently.
+
+    At most `MAX_PARALLEL_REPO_CHECKS` requests are in flight at once. They all go through the shared HTTP client, so
+    connections to the same host are reused across the batch.
+
+    Parameters
+    ----------
+    urls : list[str]
+        The URLs of the repositories.
+
+    Returns
+    -------
+    list[bool]
+        For each URL, in order, True if the repository exists, False otherwise.
+    """
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_REPO_CHECKS)
+
+    async def check(url: str) -> bool:
+        async with semaphore:
+            return await _check_repo_exists(url)
+
+    return list(await asyncio.gather(*(check(url) for url in urls)))
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """
+    Return the HTTP client shared by the repository checks, creating it on first use.
+
+    The client is bound to the event loop it was created on, so a new one is created whenever it is requested from
+    a different loop (e.g. successive `asyncio.run` calls from the CLI).
+
+    Returns
+    -------
+    httpx.AsyncClient
+        The shared HTTP client for the running event loop.
+    """
+    global _http_client, _http_client_loop  # pylint: disable=global-statement
+
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=REPO_CHECK_TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_REPO_CHECK_CONNECTIONS),
+        )
+        _http_client_loop = loop
+
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """
+    Close the HTTP client shared by the repository checks, if one has been created on the running loop.
+    """
+    global _http_client, _http_client_loop  # pylint: disable=global-statement
+
+    if _http_client is not None and _http_client_loop is asyncio.get_running_loop():
+        await _http_client.aclose()
+
+    _http_client = None
+    _http_client_loop = None
+
+
+async def _run_git_command(*args: str, config: CloneConfig, capture_stdout: bool = False) -> tuple[bytes, bytes]:
     """
     Executes a git command asynchronously and captures its output.
 
@@ -148,47 +483,142 @@ async def _run_git_command(*args: str, config: CloneConfig) -> tuple[bytes, byte
     ----------
     *args : str
         The git command and its arguments to execute.
+    config : CloneConfig
+        The configuration of the clone, providing the progress callback.
+    capture_stdout : bool
+        Whether to capture the standard output of the command, by default False. Otherwise it is discarded and
+        returned as empty bytes.
 
     Returns
     -------
     tuple[bytes, bytes]
-        A tuple containing the stdout and stderr of the git command.
+        A tuple containing the stdout (if captured) and stderr of the git command.
 
     Raises
     ------
+    ValueError
+        If the git command fails because the remote repository does not exist or is not public.
     RuntimeError
         If the git command exits with a non-zero status.
     """
-    proc = await asyncio.create_subprocess_exec(
-        *args,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    
-    if config.progress_callback:
+    # Wait for a free slot before spawning git, so that a burst of requests cannot oversubscribe the machine
+    async with _get_clone_semaphore():
+        executable = _GIT_EXECUTABLE if args[0] == "git" else args[0]
+        proc = await asyncio.create_subprocess_exec(
+            executable,
+            *args[1:],
+            stdout=asyncio.subprocess.PIPE if capture_stdout else asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            # Never let git prompt for credentials: a missing repository must fail instead of waiting for input.
+            # The environment is read on every call so that variables loaded after import (e.g. from `.env`) apply.
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+            # Descriptors opened by Python are non-inheritable (PEP 446), so there is nothing to close in the child
+            close_fds=False,
+        )
+
+        try:
+            stdout, stderr = await _communicate(proc, config=config, capture_stdout=capture_stdout)
+        finally:
+            # When cancelled (e.g. by the clone timeout), git must not outlive its slot: it would escape the
+            # concurrency limit and keep writing into a directory that is being deleted
+            if proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+                await proc.wait()
+
+        if proc.returncode != 0:
+            if _REPO_NOT_FOUND_RE.search(stderr):
+                raise ValueError("Repository not found, make sure it is public")
+
+            error_message = stderr.decode().strip()
+            raise RuntimeError(f"Git命令失败: {' '.join(args)}\n错误: {error_message}")
+
+        return stdout, stderr
+
+
+async def _communicate(
+    proc: asyncio.subprocess.Process, config: CloneConfig, capture_stdout: bool
+) -> tuple[bytes, bytes]:
+    """
+    Read the output of a git process until it exits, reporting clone progress along the way.
+
+    Parameters
+    ----------
+    proc : asyncio.subprocess.Process
+        The running git process.
+    config : CloneConfig
+        The configuration of the clone, providing the progress callback.
+    capture_stdout : bool
+        Whether the standard output of the process is a pipe that should be read.
+
+    Returns
+    -------
+    tuple[bytes, bytes]
+        A tuple containing the stdout (if captured) and stderr of the process.
+    """
+    # Drain stdout in the background so that a full pipe can never block git while stderr is being read
+    stdout_task = asyncio.create_task(proc.stdout.read()) if capture_stdout else None
+
+    try:
         progress = CloneProgress(phase="克隆中")
-        while True:
-            if proc.stderr:
-                line = await proc.stderr.readline()
-                if not line:
-                    break
-                    
-                line_str = line.decode().strip()
-                if "Receiving objects:" in line_str:
-                    try:
-                        # 解析类似 "Receiving objects:  67% (910/1363)"
-                        percent = int(line_str.split("%")[0].split(":")[-1].strip())
-                        current, total = map(int, line_str.split("(")[-1].strip(")").split("/"))
-                        progress.current = current
-                        progress.total = total
-                        progress.message = f"接收对象: {percent}%"
-                        config.progress_callback(progress)
-                    except (ValueError, IndexError):
-                        pass
-                        
-    stdout, stderr = await proc.communicate()
-    if proc.returncode != 0:
-        error_message = stderr.decode().strip()
-        raise RuntimeError(f"Git命令失败: {' '.join(args)}\n错误: {error_message}")
-
-    return stdout, stderr
+        stderr_chunks: list[bytes] = []
+        tail = b""
+        last_percent = -1
+        while chunk := await proc.stderr.read(_STDERR_CHUNK_SIZE):
+            stderr_chunks.append(chunk)
+            if not config.progress_callback:
+                continue
+
+            # Only the latest progress line of each chunk is reported
+            buffer = tail + chunk
+            match = None
+            for match in _PROGRESS_RE.finditer(buffer):
+                pass
+
+            if match is None:
+                tail = buffer[-_PROGRESS_TAIL_SIZE:]
+                continue
+
+            tail = buffer[match.end() :][-_PROGRESS_TAIL_SIZE:]
+
+            # git refreshes the line many times per percent; only report (and build the message) when it changes
+            percent = int(match.group(1))
+            if percent == last_percent:
+                continue
+
+            last_percent = percent
+            progress.current = int(match.group(2))
+            progress.total = int(match.group(3))
+            config.progress_callback(progress)
+
+        await proc.wait()
+        stdout = await stdout_task if stdout_task is not None else b""
+    finally:
+        if stdout_task is not None and not stdout_task.done():
+            stdout_task.cancel()
+
+    return stdout, b"".join(stderr_chunks)
+
+
+def _get_clone_semaphore() -> asyncio.Semaphore:
+    """
+    Return the semaphore bounding the number of concurrent git processes, creating it on first use.
+
+    Like the HTTP client, the semaphore is bound to the event loop it is first used on, so a new one is created
+    whenever it is requested from a different loop (e.g. successive `asyncio.run` calls from the CLI).
+
+    Returns
+    -------
+    asyncio.Semaphore
+        The clone semaphore for the running event loop.
+    """
+    global _clone_semaphore, _clone_semaphore_loop  # pylint: disable=global-statement
+
+    loop = asyncio.get_running_loop()
+    if _clone_semaphore is None or _clone_semaphore_loop is not loop:
+        _clone_semaphore = asyncio.Semaphore(MAX_CONCURRENT_CLONES)
+        _clone_semaphore_loop = loop
+
+    return _clone_semaphore
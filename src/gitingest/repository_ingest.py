@@ -1,13 +1,13 @@
 """ Main entry point for ingesting a source and processing its contents. """
 
 import asyncio
-import inspect
 import shutil
+from typing import Any
 
-from config import TMP_BASE_PATH
+from config import CLONE_ROOT
 from gitingest.query_ingestion import run_ingest_query
 from gitingest.query_parser import parse_query
-from gitingest.repository_clone import CloneConfig, clone_repo
+from gitingest.repository_clone import CloneConfig, cloned_repo
 
 
 def ingest(
@@ -45,11 +45,6 @@ def ingest(
         - A summary string of the analyzed repository or directory.
         - A tree-like string representation of the file structure.
         - The content of the files in the repository or directory.
-
-    Raises
-    ------
-    TypeError
-        If `clone_repo` does not return a coroutine, or if the `source` is of an unsupported type.
     """
     try:
         query = parse_query(
@@ -60,6 +55,8 @@ def ingest(
             ignore_patterns=exclude_patterns,
         )
         if query["url"]:
+            # The clone is only needed while it is being ingested, so it goes under the (preferably in-memory) clone root
+            query["local_path"] = CLONE_ROOT / query["id"] / query["slug"]
 
             # Extract relevant fields for CloneConfig
             clone_config = CloneConfig(
@@ -68,14 +65,9 @@ def ingest(
                 commit=query.get("commit"),
                 branch=query.get("branch"),
             )
-            clone_result = clone_repo(clone_config)
-
-            if inspect.iscoroutine(clone_result):
-                asyncio.run(clone_result)
-            else:
-                raise TypeError("clone_repo did not return a coroutine as expected.")
-
-        summary, tree, content = run_ingest_query(query)
+            summary, tree, content = asyncio.run(_clone_and_ingest(clone_config, query))
+        else:
+            summary, tree, content = asyncio.run(run_ingest_query(query))
 
         if output is not None:
             with open(output, "w", encoding="utf-8") as f:
@@ -85,5 +77,24 @@ def ingest(
     finally:
         # Clean up the temporary directory if it was created
         if query["url"]:
-            # Clean up the temporary directory
-            shutil.rmtree(TMP_BASE_PATH, ignore_errors=True)
+            shutil.rmtree(CLONE_ROOT / query["id"], ignore_errors=True)
+
+
+async def _clone_and_ingest(clone_config: CloneConfig, query: dict[str, Any]) -> tuple[str, str, str]:
+    """
+    Clone a repository, ingest it and delete the clone.
+
+    Parameters
+    ----------
+    clone_config : CloneConfig
+        The configuration of the clone.
+    query : dict[str, Any]
+        The parsed query to ingest the clone with.
+
+    Returns
+    -------
+    tuple[str, str, str]
+        A tuple containing the summary, directory structure, and file content.
+    """
+    async with cloned_repo(clone_config):
+        return await run_ingest_query(query)
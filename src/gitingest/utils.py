@@ -2,6 +2,7 @@
 
 import asyncio
 import functools
+import sys
 from collections.abc import Awaitable, Callable
 from typing import ParamSpec, TypeVar
 
@@ -37,6 +38,12 @@ def async_timeout(seconds: int = 10) -> Callable[[Callable[P, Awaitable[T]]], Ca
         @functools.wraps(func)
         async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
             try:
+                # `asyncio.timeout` (Python 3.11+) runs the coroutine in the current task, whereas `wait_for` has to
+                # wrap it in a new one
+                if sys.version_info >= (3, 11):
+                    async with asyncio.timeout(seconds):
+                        return await func(*args, **kwargs)
+
                 return await asyncio.wait_for(func(*args, **kwargs), timeout=seconds)
             except asyncio.TimeoutError as exc:
                 raise AsyncTimeoutError(f"Operation timed out after {seconds} seconds") from exc
@@ -6,7 +6,6 @@ import shutil
 import time
 from contextlib import asynccontextmanager
 from pathlib import Path
-from collections import defaultdict
 
 from api_analytics.fastapi import Analytics
 from dotenv import load_dotenv
@@ -19,6 +18,7 @@ from slowapi.errors import RateLimitExceeded
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 
 from config import DELETE_REPO_AFTER, TMP_BASE_PATH, REQUEST_TIMEOUT
+from gitingest.repository_clone import close_http_client
 from routers import download, dynamic, index, sse
 from server_utils import limiter
 
@@ -119,12 +119,14 @@ async def lifespan(_: FastAPI):
     except asyncio.CancelledError:
         pass
 
+    await close_http_client()
+
 
 # Initialize the FastAPI application with lifespan
 app = FastAPI(lifespan=lifespan)
 app.state.limiter = limiter
 app.state.request_timeout = REQUEST_TIMEOUT
-app.state.tasks = defaultdict(dict)
+app.state.tasks = {}
 
 
 async def rate_limit_exception_handler(request: Request, exc: Exception) -> Response:
@@ -244,5 +246,6 @@ async def robots() -> FileResponse:
 # Include routers for modular endpoints
 app.include_router(index)
 app.include_router(download)
-app.include_router(dynamic)
+# Must come before the dynamic router, whose catch-all path would otherwise match the SSE endpoint
 app.include_router(sse.router)
+app.include_router(dynamic)
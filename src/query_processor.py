@@ -10,7 +10,7 @@ from config import EXAMPLE_REPOS, MAX_DISPLAY_SIZE
 from gitingest.query_ingestion import run_ingest_query
 from gitingest.query_parser import parse_query
 from gitingest.repository_clone import CloneConfig, clone_repo
-from server_utils import Colors, log_slider_to_size
+from server_utils import CloneTask, Colors, log_slider_to_size
 
 templates = Jinja2Templates(directory="templates")
 
@@ -22,6 +22,7 @@ async def process_query(
     pattern_type: str = "exclude",
     pattern: str = "",
     is_index: bool = False,
+    task_id: str | None = None,
 ) -> _TemplateResponse:
     """
     Process a query by parsing input, cloning a repository, and generating a summary.
@@ -43,6 +44,9 @@ async def process_query(
         Pattern to include or exclude in the query, depending on the pattern type.
     is_index : bool
         Flag indicating whether the request is for the index page (default is False).
+    task_id : str | None
+        Identifier under which the clone progress is published for `/sse/clone-progress/{task_id}`, by default None
+        (progress is not published).
 
     Returns
     -------
@@ -76,6 +80,11 @@ async def process_query(
         "pattern": pattern,
     }
 
+    # The task only lives while this request runs, so abandoned or unknown ids cannot accumulate
+    task = None
+    if task_id:
+        task = request.app.state.tasks[task_id] = CloneTask()
+
     try:
         query = parse_query(
             source=input_text,
@@ -89,9 +98,13 @@ async def process_query(
             local_path=str(query["local_path"]),
             commit=query.get("commit"),
             branch=query.get("branch"),
+            progress_callback=task.update if task else None,
+            # The server keeps the existence cache across requests, so repeated lookups of missing repositories
+            # are answered without spawning git
+            verify_exists=True,
         )
         await clone_repo(clone_config)
-        summary, tree, content = run_ingest_query(query)
+        summary, tree, content = await run_ingest_query(query)
         with open(f"{clone_config.local_path}.txt", "w", encoding="utf-8") as f:
             f.write(tree + "\n" + content)
     except Exception as e:
@@ -104,6 +117,10 @@ async def process_query(
 
         context["error_message"] = f"Error: {e}"
         return template_response(context=context)
+    finally:
+        if task:
+            task.finish()
+            request.app.state.tasks.pop(task_id, None)
 
     if len(content) > MAX_DISPLAY_SIZE:
         content = (
@@ -51,6 +51,7 @@ async def process_catch_all(
     max_file_size: int = Form(...),
     pattern_type: str = Form(...),
     pattern: str = Form(...),
+    task_id: str | None = Form(None),
 ) -> HTMLResponse:
     """
     Processes the form submission with user input for query parameters.
@@ -70,6 +71,8 @@ async def process_catch_all(
         The type of pattern used for the query, specified by the user.
     pattern : str
         The pattern string used in the query, specified by the user.
+    task_id : str | None
+        Identifier chosen by the page to follow the clone progress over SSE, if any.
 
     Returns
     -------
@@ -84,4 +87,5 @@ async def process_catch_all(
         pattern_type,
         pattern,
         is_index=False,
+        task_id=task_id,
     )
@@ -49,6 +49,7 @@ async def index_post(
     max_file_size: int = Form(...),
     pattern_type: str = Form(...),
     pattern: str = Form(...),
+    task_id: str | None = Form(None),
 ) -> HTMLResponse:
     """
     Processes the form submission with user input for query parameters.
@@ -69,6 +70,8 @@ async def index_post(
         The type of pattern used for the query, specified by the user.
     pattern : str
         The pattern string used in the query, specified by the user.
+    task_id : str | None
+        Identifier chosen by the page to follow the clone progress over SSE, if any.
 
     Returns
     -------
@@ -83,4 +86,5 @@ async def index_post(
         pattern_type,
         pattern,
         is_index=True,
+        task_id=task_id,
     )
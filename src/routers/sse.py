@@ -1,25 +1,71 @@
-from fastapi import APIRouter, Request
-from sse_starlette.sse import EventSourceResponse
-from typing import AsyncGenerator
-import asyncio
-
-router = APIRouter()
-
-@router.get("/sse/clone-progress/{task_id}")
-async def clone_progress(request: Request, task_id: str) -> EventSourceResponse:
-    async def event_generator() -> AsyncGenerator[dict, None]:
-        while True:
-            if await request.is_disconnected():
-                break
-                
-            # 从内存中获取任务进度
-            progress = request.app.state.tasks.get(task_id)
-            if progress:
-                yield {
-                    "event": "progress",
-                    "data": progress.json()
-                }
-                
-            await asyncio.sleep(0.5)
-            
-    return EventSourceResponse(event_generator())
+""" This module contains the FastAPI router for streaming clone progress over server-sent events. """
+
+from typing import AsyncGenerator
+
+from fastapi import APIRouter, HTTPException, Request
+from sse_starlette.sse import EventSourceResponse
+
+from server_utils import CloneTask
+
+# Keep-alive comments keep proxies from dropping the connection while a long clone reports nothing
+PING_INTERVAL = 15  # Seconds
+SEND_TIMEOUT = 30  # Seconds
+
+router = APIRouter()
+
+
+@router.get("/sse/clone-progress/{task_id}")
+async def clone_progress(request: Request, task_id: str) -> EventSourceResponse:
+    """
+    Stream the progress of a clone task to the browser.
+
+    Progress is pushed whenever the clone reports an update, rather than polled at a fixed interval. The stream ends
+    when the task is complete or the client disconnects; in between, `EventSourceResponse` sends keep-alive pings.
+
+    Parameters
+    ----------
+    request : Request
+        The incoming request, used to access the task registry.
+    task_id : str
+        The identifier of the clone task to follow.
+
+    Returns
+    -------
+    EventSourceResponse
+        A streaming response emitting a `progress` event for every update of the task.
+
+    Raises
+    ------
+    HTTPException
+        If no clone task is registered under `task_id`.
+    """
+    # Tasks are registered by the request that runs the clone, so unknown ids never allocate anything
+    task: CloneTask | None = request.app.state.tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    # `EventSourceResponse` listens for the client disconnecting and cancels the generator when it does, so the
+    # loop only wakes up for updates
+    async def event_generator() -> AsyncGenerator[dict, None]:
+        try:
+            while True:
+                await task.updated.wait()
+
+                # Clear before reading, so that an update arriving while the event is being sent is not lost
+                task.updated.clear()
+                progress = task.progress
+                yield {"event": "progress", "data": progress.to_json()}
+
+                if progress.phase == "完成":
+                    break
+        finally:
+            # Also reached on disconnect: the producer keeps its own reference, so nothing else needs the entry
+            request.app.state.tasks.pop(task_id, None)
+
+    return EventSourceResponse(
+        event_generator(),
+        ping=PING_INTERVAL,
+        send_timeout=SEND_TIMEOUT,
+        # Stop nginx from buffering the stream, which would hold back both the updates and the pings
+        headers={"X-Accel-Buffering": "no"},
+    )
@@ -1,10 +1,14 @@
 """ Utility functions for the server. """
 
+import asyncio
 import math
+from dataclasses import dataclass, field
 
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from gitingest.repository_clone import CloneProgress
+
 # Initialize a rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
@@ -29,6 +33,42 @@ def log_slider_to_size(position: int) -> int:
     return round(math.exp(minv + (maxv - minv) * pow(position / maxp, 1.5))) * 1024
 
 
+@dataclass
+class CloneTask:
+    """
+    The progress of a clone task, as streamed to the browser over SSE.
+
+    `update` can be passed as the `progress_callback` of a `CloneConfig`. Every update sets the `updated` event, so
+    that the SSE stream waits for changes instead of polling for them.
+
+    Attributes
+    ----------
+    progress : CloneProgress
+        The latest progress reported for the task.
+    updated : asyncio.Event
+        Set whenever `progress` changes, and cleared by the consumer before reading it.
+    """
+
+    progress: CloneProgress = field(default_factory=lambda: CloneProgress(phase="等待中"))
+    updated: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def update(self, progress: CloneProgress) -> None:
+        """
+        Store the latest progress and wake up the consumer.
+
+        Parameters
+        ----------
+        progress : CloneProgress
+            The progress reported by the clone.
+        """
+        self.progress = progress
+        self.updated.set()
+
+    def finish(self) -> None:
+        """Report that the task is done, which ends the SSE stream following it."""
+        self.update(CloneProgress(phase="完成"))
+
+
 ## Color printing utility
 class Colors:
     """ANSI color codes"""
@@ -56,6 +56,12 @@ function handleSubmit(event, showLoading = false) {
         formData.append('pattern', pattern.value);
     }
 
+    // Follow the clone progress of this submission, when the browser can generate an id for it
+    const taskId = window.crypto?.randomUUID?.();
+    if (taskId) {
+        formData.append('task_id', taskId);
+    }
+
     const originalContent = submitButton.innerHTML;
     const currentStars = document.getElementById('github-stars')?.textContent;
 
@@ -74,10 +80,17 @@ function handleSubmit(event, showLoading = false) {
     }
 
     // Submit the form
-    fetch(form.action, {
+    const request = fetch(form.action, {
         method: 'POST',
         body: formData
-    })
+    });
+
+    // The task is registered once the server starts handling the form, so subscribe shortly after sending it
+    if (taskId) {
+        setTimeout(() => initCloneProgress(taskId), 500);
+    }
+
+    request
         .then(response => response.text())
         .then(html => {
             // Store the star count before updating the DOM
@@ -211,7 +224,7 @@ function initCloneProgress(taskId) {
             <div class="flex items-center space-x-2">
                 <div class="w-full bg-gray-200 rounded-full h-2.5">
                     <div class="bg-blue-600 h-2.5 rounded-full" 
-                         style="width: ${(progress.current / progress.total * 100)}%">
+                         style="width: ${progress.total ? progress.current / progress.total * 100 : 0}%">
                     </div>
                 </div>
                 <span class="text-sm text-gray-600">
@@ -1,10 +1,28 @@
 """ Tests for the query_ingestion module """
 
+import ntpath
+import os
 from pathlib import Path
 from typing import Any
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
-from gitingest.query_ingestion import _extract_files_content, _read_file_content, _scan_directory
+import pytest
+
+from gitingest.query_ingestion import (
+    TOKEN_ESTIMATE_THRESHOLD,
+    DirectoryNode,
+    FileNode,
+    _compile_patterns,
+    _create_tree_structure,
+    _extract_files_content,
+    _generate_token_string,
+    _is_safe_symlink,
+    _read_file_content,
+    _scan_directory,
+    _should_include,
+    _sort_children,
+    run_ingest_query,
+)
 
 
 def test_scan_directory(temp_directory: Path, sample_query: dict[str, Any]) -> None:
@@ -13,10 +31,10 @@ def test_scan_directory(temp_directory: Path, sample_query: dict[str, Any]) -> N
     if result is None:
         assert False, "Result is None"
 
-    assert result["type"] == "directory"
-    assert result["file_count"] == 8  # All .txt and .py files
-    assert result["dir_count"] == 4  # src, src/subdir, dir1, dir2
-    assert len(result["children"]) == 5  # file1.txt, file2.py, src, dir1, dir2
+    assert isinstance(result, DirectoryNode)
+    assert result.file_count == 8  # All .txt and .py files
+    assert result.dir_count == 4  # src, src/subdir, dir1, dir2
+    assert len(result.children) == 5  # file1.txt, file2.py, src, dir1, dir2
 
 
 def test_extract_files_content(temp_directory: Path, sample_query: dict[str, Any]) -> None:
@@ -24,7 +42,7 @@ def test_extract_files_content(temp_directory: Path, sample_query: dict[str, Any
     nodes = _scan_directory(temp_directory, query=sample_query)
     if nodes is None:
         assert False, "Nodes is None"
-    files = _extract_files_content(query=sample_query, node=nodes, max_file_size=1_000_000)
+    files = _extract_files_content(node=nodes, max_file_size=1_000_000)
     assert len(files) == 8  # All .txt and .py files
 
     # Check for presence of key files
@@ -38,16 +56,71 @@ def test_extract_files_content(temp_directory: Path, sample_query: dict[str, Any
     assert any("file_dir2.txt" in p for p in paths)
 
 
+def test_scan_directory_stops_at_max_files(tmp_path: Path, sample_query: dict[str, Any]) -> None:
+    (tmp_path / "a.txt").write_text("a")
+    for name in ("d1", "d2", "d3"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "x.txt").write_text("x")
+        (tmp_path / name / "y.txt").write_text("y")
+    sample_query["local_path"] = tmp_path
+
+    with patch("gitingest.query_ingestion.MAX_FILES", 2):
+        result = _scan_directory(tmp_path, query=sample_query)
+
+    assert result is not None, "Result should not be None"
+    assert result.file_count == 2
+    # Directories still queued when the limit was reached are left out rather than shown as empty
+    subdirs = [child for child in result.children if isinstance(child, DirectoryNode)]
+    assert len(subdirs) == 1
+    assert result.dir_count == 1
+
+
+def test_scan_directory_skips_reading_large_files(temp_directory: Path, sample_query: dict[str, Any]) -> None:
+    sample_query["local_path"] = temp_directory
+    sample_query["max_file_size"] = 11  # Only "Hello World" (11 bytes) fits
+
+    with patch("gitingest.query_ingestion._read_file_content", return_value="content") as mock_read:
+        result = _scan_directory(temp_directory, query=sample_query)
+        assert result is not None, "Result should not be None"
+        assert mock_read.call_count == 1
+
+    files = _extract_files_content(node=result, max_file_size=sample_query["max_file_size"])
+    assert sorted(f["path"] for f in files if f["content"]) == ["file1.txt"]
+
+
 def test_read_file_content_with_notebook(tmp_path: Path):
     notebook_path = tmp_path / "dummy_notebook.ipynb"
     notebook_path.write_text("{}", encoding="utf-8")  # minimal JSON
 
     # Patch the symbol as it is used in query_ingestion
     with patch("gitingest.query_ingestion.process_notebook") as mock_process:
-        _read_file_content(notebook_path)
+        _read_file_content(notebook_path, is_notebook=True)
         mock_process.assert_called_once_with(notebook_path)
 
 
+def test_scan_directory_dispatches_notebooks_by_name(tmp_path: Path, sample_query: dict[str, Any]) -> None:
+    (tmp_path / "dummy_notebook.ipynb").write_text("{}", encoding="utf-8")
+    (tmp_path / "dummy_file.py").write_text("print('Hello')", encoding="utf-8")
+    sample_query["local_path"] = tmp_path
+
+    with patch("gitingest.query_ingestion.process_notebook", return_value="notebook") as mock_process:
+        result = _scan_directory(tmp_path, query=sample_query)
+        mock_process.assert_called_once_with(tmp_path / "dummy_notebook.ipynb")
+
+    assert result is not None, "Result should not be None"
+    assert {child.name: child.content for child in result.children} == {
+        "dummy_file.py": "print('Hello')",
+        "dummy_notebook.ipynb": "notebook",
+    }
+
+
+def test_read_file_content_normalizes_newlines(tmp_path: Path) -> None:
+    file_path = tmp_path / "windows.txt"
+    file_path.write_bytes(b"line1\r\nline2\rline3\n")
+
+    assert _read_file_content(file_path) == "line1\nline2\nline3\n"
+
+
 def test_read_file_content_with_non_notebook(tmp_path: Path):
     py_file_path = tmp_path / "dummy_file.py"
     py_file_path.write_text("print('Hello')", encoding="utf-8")
@@ -57,6 +130,78 @@ def test_read_file_content_with_non_notebook(tmp_path: Path):
         mock_process.assert_not_called()
 
 
+def test_is_safe_symlink(tmp_path: Path) -> None:
+    target = tmp_path / "target.txt"
+    target.write_text("Hello", encoding="utf-8")
+    (tmp_path / "inside").symlink_to(target)
+    (tmp_path / "outside").symlink_to(tmp_path.parent)
+
+    base_resolved = tmp_path.resolve()
+    assert _is_safe_symlink(tmp_path / "inside", base_resolved)
+    assert not _is_safe_symlink(tmp_path / "outside", base_resolved)
+
+
+def test_scan_directory_symlinked_directory_uses_real_path(tmp_path: Path, sample_query: dict[str, Any]) -> None:
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "x.txt").write_text("x")
+    (tmp_path / "a" / "b" / "y.txt").write_text("y")
+    # A shallow alias is reached by the breadth-first walk before the real directory is
+    (tmp_path / "alias").symlink_to(tmp_path / "a" / "b")
+    sample_query["local_path"] = tmp_path
+    sample_query["include_patterns"] = ["a/*"]
+
+    result = _scan_directory(tmp_path, query=sample_query)
+
+    assert result is not None, "Result should not be None"
+    assert result.file_count == 2
+    files = _extract_files_content(node=result, max_file_size=sample_query["max_file_size"])
+    assert sorted(f["path"] for f in files) == [os.path.join("a", "b", "y.txt"), os.path.join("a", "x.txt")]
+
+
+def test_scan_directory_lists_aliased_directory_at_its_real_location(
+    tmp_path: Path, sample_query: dict[str, Any]
+) -> None:
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "y.py").write_text("y")
+    (tmp_path / "linkdir").symlink_to(tmp_path / "a" / "b")
+    (tmp_path / "ignored").mkdir()
+    (tmp_path / "ignored" / "z.py").write_text("z")
+    (tmp_path / "to_ignored").symlink_to(tmp_path / "ignored")
+    sample_query["local_path"] = tmp_path
+    sample_query["ignore_patterns"] = ["ignored"]
+
+    result = _scan_directory(tmp_path, query=sample_query)
+
+    assert result is not None, "Result should not be None"
+    assert _create_tree_structure(sample_query, result) == (
+        f"└── {tmp_path.name}/\n    └── a/\n        └── b/\n            └── y.py\n"
+    )
+    files = _extract_files_content(node=result, max_file_size=sample_query["max_file_size"])
+    assert [f["path"] for f in files] == [os.path.join("a", "b", "y.py")]
+
+
+def test_sort_children_order() -> None:
+    children = [
+        DirectoryNode(name=".git", path="", rel_path=""),
+        DirectoryNode(name="src", path="", rel_path=""),
+        FileNode(name=".env", path="", rel_path="", size=0),
+        FileNode(name="setup.py", path="", rel_path="", size=0),
+        FileNode(name="README.md", path="", rel_path="", size=0),
+        FileNode(name="LICENSE", path="", rel_path="", size=0),
+    ]
+
+    names = [child.name for child in _sort_children(children)]
+    assert names == ["README.md", "LICENSE", "setup.py", ".env", "src", ".git"]
+
+
+def test_generate_token_string_large_input_is_approximated():
+    context_string = "a" * (TOKEN_ESTIMATE_THRESHOLD + 4)
+
+    with patch("gitingest.query_ingestion._get_encoding") as mock_get_encoding:
+        assert _generate_token_string(context_string) == "1.3M"
+        mock_get_encoding.assert_not_called()
+
+
 # Test that when using a ['*.txt'] as include pattern, only .txt files are processed & .py files are excluded
 def test_include_txt_pattern(temp_directory: Path, sample_query: dict[str, Any]) -> None:
     sample_query["local_path"] = temp_directory
@@ -65,7 +210,7 @@ def test_include_txt_pattern(temp_directory: Path, sample_query: dict[str, Any])
     result = _scan_directory(temp_directory, query=sample_query)
     assert result is not None, "Result should not be None"
 
-    files = _extract_files_content(query=sample_query, node=result, max_file_size=1_000_000)
+    files = _extract_files_content(node=result, max_file_size=1_000_000)
     file_paths = [f["path"] for f in files]
     assert len(files) == 5, "Should have found exactly 5 .txt files"
     assert all(path.endswith(".txt") for path in file_paths), "Should only include .txt files"
@@ -77,6 +222,94 @@ def test_include_txt_pattern(temp_directory: Path, sample_query: dict[str, Any])
     assert not any(path.endswith(".py") for path in file_paths), "Should not include .py files"
 
 
+def test_include_multiple_patterns(temp_directory: Path, sample_query: dict[str, Any]) -> None:
+    sample_query["local_path"] = temp_directory
+    sample_query["include_patterns"] = ["*.txt", "*.py"]
+
+    result = _scan_directory(temp_directory, query=sample_query)
+    assert result is not None, "Result should not be None"
+
+    files = _extract_files_content(node=result, max_file_size=1_000_000)
+    assert len(files) == 8, "Should have found all .txt and .py files"
+
+
+def test_include_empty_pattern_matches_nothing(temp_directory: Path, sample_query: dict[str, Any]) -> None:
+    sample_query["local_path"] = temp_directory
+    sample_query["include_patterns"] = [""]
+
+    result = _scan_directory(temp_directory, query=sample_query)
+    assert result is not None, "Result should not be None"
+    assert result.file_count == 0
+
+
+def test_patterns_follow_normcase() -> None:
+    # Emulate Windows, where `fnmatch` matches case-insensitively and treats "/" and "\\" alike
+    with patch("os.path.normcase", ntpath.normcase):
+        include_re = _compile_patterns(["src/*.PY"])
+        assert _should_include("src\\Main.py", include_re)
+
+
+@pytest.mark.asyncio
+async def test_run_ingest_query_output(tmp_path: Path, sample_query: dict[str, Any]) -> None:
+    # The expected output was produced by the original recursive implementation on the same tree
+    repo = tmp_path / "repo"
+    files = {
+        "README.md": "# Title\n",
+        "setup.py": "print('setup')\n",
+        ".env": "KEY=1\n",
+        "src/main.py": "import os\n",
+        "src/.hidden.py": "x = 1\n",
+        "src/utils/a.py": "a = 1\n",
+        "src/utils/b.py": "b = 2\n",
+        "docs/guide.md": "Guide\n",
+        ".github/ci.yml": "on: push\n",
+        "empty/.keep": "",
+    }
+    for rel_path, content in files.items():
+        (repo / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (repo / rel_path).write_text(content)
+    sample_query["local_path"] = repo
+
+    encoding = MagicMock()
+    encoding.encode.side_effect = lambda text, **kwargs: text.split()
+    with patch("gitingest.query_ingestion._get_encoding", return_value=encoding):
+        summary, tree, content = await run_ingest_query(sample_query)
+
+    assert summary == "Repository: test_user/test_repo\nFiles analyzed: 10\n\nEstimated tokens: 95"
+    assert tree == (
+        "Directory structure:\n"
+        "└── repo/\n"
+        "    ├── README.md\n"
+        "    ├── setup.py\n"
+        "    ├── .env\n"
+        "    ├── docs/\n"
+        "    │   └── guide.md\n"
+        "    ├── empty/\n"
+        "    │   └── .keep\n"
+        "    ├── src/\n"
+        "    │   ├── main.py\n"
+        "    │   ├── .hidden.py\n"
+        "    │   └── utils/\n"
+        "    │       ├── a.py\n"
+        "    │       └── b.py\n"
+        "    └── .github/\n"
+        "        └── ci.yml\n"
+    )
+    separator = "=" * 48 + "\n"
+    expected_files = [
+        ("README.md", "# Title\n"),
+        ("setup.py", "print('setup')\n"),
+        (".env", "KEY=1\n"),
+        ("docs/guide.md", "Guide\n"),
+        ("src/main.py", "import os\n"),
+        ("src/.hidden.py", "x = 1\n"),
+        ("src/utils/a.py", "a = 1\n"),
+        ("src/utils/b.py", "b = 2\n"),
+        (".github/ci.yml", "on: push\n"),
+    ]
+    assert content == "".join(f"{separator}File: {path}\n{separator}{text}\n\n" for path, text in expected_files)
+
+
 # TODO: test with wrong include patterns: ['*.qwerty']
 
 
@@ -87,6 +320,5 @@ def test_include_txt_pattern(temp_directory: Path, sample_query: dict[str, Any])
 # TODO: test with include patterns: ['/src*']
 
 # multiple patterns
-# TODO: test with multiple include patterns: ['*.txt', '*.py']
 # TODO: test with multiple include patterns: ['/src/*', '*.txt']
 # TODO: test with multiple include patterns: ['/src*', '*.txt']
@@ -1,10 +1,57 @@
 """ Tests for the repository_clone module. """
 
-from unittest.mock import AsyncMock, patch
-
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+import httpx
 import pytest
 
-from gitingest.repository_clone import CloneConfig, _check_repo_exists, clone_repo
+from gitingest.repository_clone import (
+    REPO_MISSING_CACHE_TTL,
+    CloneConfig,
+    CloneProgress,
+    RepoCache,
+    _check_repo_exists,
+    _get_clone_semaphore,
+    _repo_exists_cache,
+    _run_git_command,
+    check_many,
+    clone_repo,
+    cloned_repo,
+)
+
+
+def _mock_git_process(stdout: bytes, stderr_chunks: list[bytes], returncode: int) -> MagicMock:
+    """
+    Build a mock git process with the given output.
+
+    Stdout is a real stream reader, while stderr returns one of the given chunks per read and then `b""` (EOF).
+    """
+    process = MagicMock()
+    process.stdout = asyncio.StreamReader()
+    process.stdout.feed_data(stdout)
+    process.stdout.feed_eof()
+    process.stderr.read = AsyncMock(side_effect=[*stderr_chunks, b""])
+    process.wait = AsyncMock(return_value=returncode)
+    process.returncode = returncode
+    return process
+
+
+@pytest.fixture(autouse=True)
+def clear_repo_exists_cache():
+    """
+    Clear the repository existence cache so that every test performs its own checks.
+    """
+    _repo_exists_cache.clear()
+    yield
+    _repo_exists_cache.clear()
 
 
 @pytest.mark.asyncio
@@ -14,10 +61,11 @@ async def test_clone_repo_with_commit() -> None:
     Verifies that the repository is cloned and checked out to the specified commit.
     """
     clone_config = CloneConfig(
-        url="https://github.com/user/repo",
+        url="https://git.example.com/user/repo",
         local_path="/tmp/repo",
         commit="a" * 40,  # Simulating a valid commit hash
         branch="main",
+        verify_exists=True,
     )
 
     with patch("gitingest.repository_clone._check_repo_exists", return_value=True) as mock_check:
@@ -27,7 +75,23 @@ async def test_clone_repo_with_commit() -> None:
             mock_exec.return_value = mock_process
             await clone_repo(clone_config)
             mock_check.assert_called_once_with(clone_config.url)
-            assert mock_exec.call_count == 2  # Clone and checkout calls
+
+    # The commit takes precedence over the branch
+    assert mock_exec.call_args_list == [
+        call(
+            "git",
+            "-c",
+            "protocol.version=2",
+            "clone",
+            "--filter=blob:none",
+            "--no-checkout",
+            "--single-branch",
+            clone_config.url,
+            clone_config.local_path,
+            config=clone_config,
+        ),
+        call("git", "-C", clone_config.local_path, "checkout", clone_config.commit, config=clone_config),
+    ]
 
 
 @pytest.mark.asyncio
@@ -36,7 +100,13 @@ async def test_clone_repo_without_commit() -> None:
     Test the `clone_repo` function when no commit hash is provided.
     Verifies that only the repository clone operation is performed.
     """
-    query = CloneConfig(url="https://github.com/user/repo", local_path="/tmp/repo", commit=None, branch="main")
+    query = CloneConfig(
+        url="https://git.example.com/user/repo",
+        local_path="/tmp/repo",
+        commit=None,
+        branch="main",
+        verify_exists=True,
+    )
 
     with patch("gitingest.repository_clone._check_repo_exists", return_value=True) as mock_check:
         with patch("gitingest.repository_clone._run_git_command", new_callable=AsyncMock) as mock_exec:
@@ -56,10 +126,11 @@ async def test_clone_repo_nonexistent_repository() -> None:
     Verifies that a ValueError is raised with an appropriate error message.
     """
     clone_config = CloneConfig(
-        url="https://github.com/user/nonexistent-repo",
+        url="https://git.example.com/user/nonexistent-repo",
         local_path="/tmp/repo",
         commit=None,
         branch="main",
+        verify_exists=True,
     )
     with patch("gitingest.repository_clone._check_repo_exists", return_value=False) as mock_check:
         with pytest.raises(ValueError, match="Repository not found"):
@@ -67,6 +138,243 @@ async def test_clone_repo_nonexistent_repository() -> None:
             mock_check.assert_called_once_with(clone_config.url)
 
 
+@pytest.mark.asyncio
+async def test_clone_repo_skips_existence_check_by_default() -> None:
+    """
+    Test the `clone_repo` function without `verify_exists`.
+    Verifies that no existence check is made and a missing repository is reported from git's output instead.
+    """
+    clone_config = CloneConfig(url="https://github.com/user/nonexistent-repo", local_path="/tmp/repo")
+
+    with patch("gitingest.repository_clone._check_repo_exists", new_callable=AsyncMock) as mock_check:
+        with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
+            mock_exec.return_value = _mock_git_process(b"", [b"remote: Repository not found.\nfatal: ..."], 128)
+
+            with pytest.raises(ValueError, match="Repository not found"):
+                await clone_repo(clone_config)
+            mock_check.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_clone_repo_skips_existence_check_for_known_hosts() -> None:
+    """
+    Test the `clone_repo` function with `verify_exists` for a GitHub repository.
+    Verifies that no HTTP check is made and a missing repository is reported from git's output instead.
+    """
+    clone_config = CloneConfig(
+        url="https://github.com/user/nonexistent-repo", local_path="/tmp/repo", verify_exists=True
+    )
+
+    with patch("gitingest.repository_clone._check_repo_exists", new_callable=AsyncMock) as mock_check:
+        with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
+            mock_exec.return_value = _mock_git_process(b"", [b"remote: Repository not found.\nfatal: ..."], 128)
+
+            with pytest.raises(ValueError, match="Repository not found"):
+                await clone_repo(clone_config)
+            mock_check.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "stderr",
+    [
+        # GitHub
+        b"Cloning into '/tmp/repo'...\nremote: Repository not found.\n"
+        b"fatal: repository 'https://github.com/user/nonexistent-repo/' not found\n",
+        # A smart HTTP server answering 404, e.g. GitLab or Gitea
+        b"Cloning into '/tmp/repo'...\nfatal: repository 'https://git.example.com/user/nonexistent-repo/' not found\n",
+        b"Cloning into '/tmp/repo'...\nfatal: unable to access 'https://git.example.com/user/nonexistent-repo/': "
+        b"The requested URL returned error: 404\n",
+        # A private repository, for which git would ask for credentials
+        b"Cloning into '/tmp/repo'...\n"
+        b"fatal: could not read Username for 'https://git.example.com': terminal prompts disabled\n",
+    ],
+)
+async def test_run_git_command_reports_missing_repository(stderr: bytes) -> None:
+    """
+    Test that `_run_git_command` turns git's errors for a missing repository into a ValueError.
+    """
+    clone_config = CloneConfig(url="https://git.example.com/user/nonexistent-repo", local_path="/tmp/repo")
+
+    with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
+        mock_exec.return_value = _mock_git_process(b"", [stderr], 128)
+        with pytest.raises(ValueError, match="Repository not found"):
+            await _run_git_command("git", "clone", clone_config.url, clone_config.local_path, config=clone_config)
+
+
+@pytest.mark.asyncio
+async def test_run_git_command_reports_other_failures() -> None:
+    """
+    Test that `_run_git_command` raises a RuntimeError with git's output for failures other than a missing repository.
+    """
+    clone_config = CloneConfig(url="https://git.example.com/user/repo", local_path="/tmp/repo")
+    stderr = b"fatal: unable to access 'https://git.example.com/user/repo/': Could not resolve host: git.example.com\n"
+
+    with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
+        mock_exec.return_value = _mock_git_process(b"", [stderr], 128)
+        with pytest.raises(RuntimeError, match="Could not resolve host"):
+            await _run_git_command("git", "clone", clone_config.url, clone_config.local_path, config=clone_config)
+
+
+@pytest.mark.asyncio
+async def test_run_git_command_uses_current_environment(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that `_run_git_command` passes the environment as it is at call time and disables credential prompts.
+    """
+    monkeypatch.setenv("HTTPS_PROXY", "http://proxy.local:3128")
+    clone_config = CloneConfig(url="https://github.com/user/repo", local_path="/tmp/repo")
+
+    with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
+        mock_exec.return_value = _mock_git_process(b"", [], 0)
+        await _run_git_command("git", "clone", config=clone_config)
+
+    env = mock_exec.call_args.kwargs["env"]
+    assert env["HTTPS_PROXY"] == "http://proxy.local:3128"
+    assert env["GIT_TERMINAL_PROMPT"] == "0"
+
+
+@pytest.mark.asyncio
+async def test_run_git_command_reports_progress() -> None:
+    """
+    Test the `_run_git_command` function with a progress callback.
+    Verifies that progress lines split between reads are still parsed, that an update is only reported when the
+    percentage changes, and that stderr is returned in full.
+    """
+    updates: list[tuple[int, int, str]] = []
+
+    def on_progress(progress: CloneProgress) -> None:
+        updates.append((progress.current, progress.total, progress.message))
+
+    stderr_chunks = [
+        b"Receiving objects:  50% (100/200)\r",
+        b"Receiving objects:  50% (101/200)\rReceiving obj",
+        b"ects: 100% (200/200), done.\n",
+    ]
+    clone_config = CloneConfig(
+        url="https://github.com/user/repo", local_path="/tmp/repo", progress_callback=on_progress
+    )
+
+    with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
+        mock_exec.return_value = _mock_git_process(b"output", stderr_chunks, 0)
+        stdout, stderr = await _run_git_command("git", "clone", config=clone_config, capture_stdout=True)
+
+    assert stdout == b"output"
+    assert stderr == b"".join(stderr_chunks)
+    # The second line repeats the same percentage and is not reported again
+    assert updates == [(100, 200, "接收对象: 50%"), (200, 200, "接收对象: 100%")]
+
+
+@pytest.mark.asyncio
+async def test_run_git_command_discards_stdout_by_default() -> None:
+    """
+    Test that `_run_git_command` sends the standard output of git to `/dev/null` unless asked to capture it.
+    """
+    clone_config = CloneConfig(url="https://github.com/user/repo", local_path="/tmp/repo")
+
+    with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
+        mock_exec.return_value = _mock_git_process(b"output", [], 0)
+        stdout, _ = await _run_git_command("git", "clone", config=clone_config)
+
+    assert stdout == b""
+    assert mock_exec.call_args.kwargs["stdout"] == asyncio.subprocess.DEVNULL
+
+
+@pytest.mark.asyncio
+async def test_run_git_command_allows_posix_spawn() -> None:
+    """
+    Test that `_run_git_command` spawns git by its absolute path without closing descriptors, the conditions under
+    which CPython uses `posix_spawn` rather than `fork`.
+    """
+    clone_config = CloneConfig(url="https://github.com/user/repo", local_path="/tmp/repo")
+
+    with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
+        mock_exec.return_value = _mock_git_process(b"", [], 0)
+        await _run_git_command("git", "clone", config=clone_config)
+
+    executable, *args = mock_exec.call_args.args
+    assert os.path.isabs(executable)
+    assert args == ["clone"]
+    assert mock_exec.call_args.kwargs["close_fds"] is False
+
+
+@pytest.mark.asyncio
+async def test_run_git_command_limits_concurrency() -> None:
+    """
+    Test that `_run_git_command` does not run more git processes at once than the clone semaphore allows.
+    """
+    running = 0
+    max_running = 0
+
+    async def spawn(*args, **kwargs) -> MagicMock:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        process = _mock_git_process(b"", [], 0)
+
+        async def wait() -> int:
+            nonlocal running
+            await asyncio.sleep(0.01)
+            running -= 1
+            return 0
+
+        process.wait = wait
+        return process
+
+    clone_config = CloneConfig(url="https://github.com/user/repo", local_path="/tmp/repo")
+    with patch("gitingest.repository_clone._get_clone_semaphore", return_value=asyncio.Semaphore(2)):
+        with patch("asyncio.create_subprocess_exec", side_effect=spawn):
+            await asyncio.gather(*(_run_git_command("git", "clone", config=clone_config) for _ in range(5)))
+
+    assert max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_run_git_command_kills_process_when_cancelled() -> None:
+    """
+    Test that `_run_git_command` kills the process it spawned when it is cancelled, e.g. by the clone timeout.
+    """
+    processes: list[asyncio.subprocess.Process] = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def spawn(*args, **kwargs) -> asyncio.subprocess.Process:
+        process = await create_subprocess_exec(*args, **kwargs)
+        processes.append(process)
+        return process
+
+    clone_config = CloneConfig(url="https://github.com/user/repo", local_path="/tmp/repo")
+    with patch("asyncio.create_subprocess_exec", side_effect=spawn):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(_run_git_command("sleep", "10", config=clone_config), timeout=0.2)
+
+    assert processes[0].returncode is not None
+
+
+def test_clone_semaphore_is_bound_to_the_running_loop() -> None:
+    """
+    Test that the clone semaphore is shared within an event loop and recreated for a new one.
+    """
+
+    async def get_semaphores() -> tuple[asyncio.Semaphore, asyncio.Semaphore]:
+        return _get_clone_semaphore(), _get_clone_semaphore()
+
+    first, again = asyncio.run(get_semaphores())
+    other, _ = asyncio.run(get_semaphores())
+
+    assert first is again
+    assert other is not first
+
+
+def test_clone_progress_to_json() -> None:
+    """
+    Test that `CloneProgress.to_json` serializes the current state of the progress.
+    """
+    progress = CloneProgress(phase="克隆中", current=1, total=2)
+    assert json.loads(progress.to_json()) == {"phase": "克隆中", "current": 1, "total": 2, "message": "接收对象: 50%"}
+
+    progress.current = 2
+    assert json.loads(progress.to_json())["current"] == 2
+
+
 @pytest.mark.asyncio
 async def test_check_repo_exists() -> None:
     """
@@ -75,25 +383,72 @@ async def test_check_repo_exists() -> None:
     """
     url = "https://github.com/user/repo"
 
-    with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
-        mock_process = AsyncMock()
-        mock_process.communicate.return_value = (b"HTTP/1.1 200 OK\n", b"")
-        mock_exec.return_value = mock_process
-
+    with patch("httpx.AsyncClient.head", new_callable=AsyncMock) as mock_head:
         # Test existing repository
-        mock_process.returncode = 0
+        mock_head.return_value = httpx.Response(200)
         assert await _check_repo_exists(url) is True
+        mock_head.assert_called_once_with(url)
 
         # Test non-existing repository (404 response)
-        mock_process.communicate.return_value = (b"HTTP/1.1 404 Not Found\n", b"")
-        mock_process.returncode = 0
+        _repo_exists_cache.clear()
+        mock_head.return_value = httpx.Response(404)
         assert await _check_repo_exists(url) is False
 
         # Test failed request
-        mock_process.returncode = 1
+        _repo_exists_cache.clear()
+        mock_head.side_effect = httpx.ConnectError("Connection refused")
         assert await _check_repo_exists(url) is False
 
 
+@pytest.mark.asyncio
+async def test_check_repo_exists_caches_results() -> None:
+    """
+    Test that `_check_repo_exists` caches its answers per URL.
+    Verifies that repeated checks skip the request and that a cached 404 expires after its TTL.
+    """
+    url = "https://github.com/user/repo"
+
+    with patch("httpx.AsyncClient.head", new_callable=AsyncMock) as mock_head:
+        mock_head.return_value = httpx.Response(404)
+        assert await _check_repo_exists(url) is False
+        assert await _check_repo_exists(url) is False
+        assert mock_head.call_count == 1
+
+        mock_head.return_value = httpx.Response(200)
+        with patch("time.monotonic", return_value=time.monotonic() + REPO_MISSING_CACHE_TTL + 1):
+            assert await _check_repo_exists(url) is True
+        assert mock_head.call_count == 2
+
+        # Failed requests are not cached
+        mock_head.side_effect = httpx.ConnectError("Connection refused")
+        assert await _check_repo_exists("https://github.com/user/other") is False
+        assert "https://github.com/user/other" not in _repo_exists_cache
+
+
+@pytest.mark.asyncio
+async def test_check_many() -> None:
+    """
+    Test that `check_many` answers for every URL in order while capping the number of concurrent requests.
+    """
+    in_flight = 0
+    max_in_flight = 0
+
+    async def head(url: str) -> httpx.Response:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(404 if url.endswith("missing") else 200)
+
+    urls = [f"https://github.com/user/repo{i}" for i in range(5)] + ["https://github.com/user/missing"]
+    with patch("gitingest.repository_clone.MAX_PARALLEL_REPO_CHECKS", 2):
+        with patch("httpx.AsyncClient.head", side_effect=head):
+            assert await check_many(urls) == [True] * 5 + [False]
+
+    assert max_in_flight == 2
+
+
 @pytest.mark.asyncio
 async def test_clone_repo_invalid_url() -> None:
     """
@@ -138,6 +493,8 @@ async def test_clone_repo_with_custom_branch() -> None:
             await clone_repo(clone_config)
             mock_exec.assert_called_once_with(
                 "git",
+                "-c",
+                "protocol.version=2",
                 "clone",
                 "--depth=1",
                 "--single-branch",
@@ -145,9 +502,164 @@ async def test_clone_repo_with_custom_branch() -> None:
                 "feature-branch",
                 clone_config.url,
                 clone_config.local_path,
+                config=clone_config,
             )
 
 
+@pytest.mark.asyncio
+async def test_clone_repo_requests_progress_with_callback() -> None:
+    """
+    Test the `clone_repo` function with a progress callback.
+    Verifies that git is asked to report progress even though its stderr is a pipe.
+    """
+    clone_config = CloneConfig(
+        url="https://github.com/user/repo",
+        local_path="/tmp/repo",
+        progress_callback=lambda progress: None,
+    )
+    with patch("gitingest.repository_clone._run_git_command", new_callable=AsyncMock) as mock_exec:
+        await clone_repo(clone_config)
+
+    mock_exec.assert_called_once_with(
+        "git",
+        "-c",
+        "protocol.version=2",
+        "clone",
+        "--progress",
+        "--depth=1",
+        "--single-branch",
+        clone_config.url,
+        clone_config.local_path,
+        config=clone_config,
+    )
+
+
+@pytest.mark.asyncio
+async def test_clone_repo_coalesces_concurrent_clones(tmp_path: Path) -> None:
+    """
+    Test the `clone_repo` function when the same repository is cloned twice at the same time.
+    Verifies that git runs only once and that the second clone is a hard-linked copy of the first.
+    """
+
+    async def fake_clone(*args: str, config: CloneConfig) -> tuple[bytes, bytes]:
+        await asyncio.sleep(0.01)
+        Path(config.local_path).mkdir()
+        (Path(config.local_path) / "README.md").write_text("Hello", encoding="utf-8")
+        return b"", b""
+
+    first = CloneConfig(url="https://github.com/user/repo", local_path=str(tmp_path / "first"))
+    second = CloneConfig(url="https://github.com/user/repo", local_path=str(tmp_path / "second"))
+
+    with patch("gitingest.repository_clone._run_git_command", side_effect=fake_clone) as mock_exec:
+        await asyncio.gather(clone_repo(first), clone_repo(second))
+
+    assert mock_exec.call_count == 1
+    assert (tmp_path / "second" / "README.md").stat().st_ino == (tmp_path / "first" / "README.md").stat().st_ino
+
+
+@pytest.mark.asyncio
+async def test_cloned_repo_removes_clone_on_exit(tmp_path: Path) -> None:
+    """
+    Test the `cloned_repo` context manager.
+    Verifies that the clone is available inside the block and deleted afterwards, even if the block fails.
+    """
+
+    async def fake_clone(*args: str, config: CloneConfig) -> tuple[bytes, bytes]:
+        Path(config.local_path).mkdir()
+        return b"", b""
+
+    clone_config = CloneConfig(url="https://github.com/user/repo", local_path=str(tmp_path / "repo"))
+
+    with patch("gitingest.repository_clone._run_git_command", side_effect=fake_clone):
+        with pytest.raises(RuntimeError, match="ingest failed"):
+            async with cloned_repo(clone_config) as path:
+                assert path.is_dir()
+                raise RuntimeError("ingest failed")
+
+    assert not (tmp_path / "repo").exists()
+
+
+@pytest.mark.asyncio
+async def test_repo_cache_reuses_and_evicts_mirrors(tmp_path: Path) -> None:
+    """
+    Test the `RepoCache.worktree` method.
+    Verifies that a mirror is cloned once and then fetched, and that the least recently used mirror is evicted.
+    """
+
+    async def fake_git(*args: str, config: CloneConfig) -> tuple[bytes, bytes]:
+        if "--mirror" in args:
+            Path(args[-1]).mkdir()
+        return b"", b""
+
+    cache = RepoCache(tmp_path, max_repos=1)
+    first = CloneConfig(url="https://github.com/user/first", local_path="/tmp/first")
+    second = CloneConfig(url="https://github.com/user/second", local_path="/tmp/second")
+
+    with patch("gitingest.repository_clone._run_git_command", side_effect=fake_git) as mock_exec:
+        await cache.worktree(first)
+        await cache.worktree(first)
+        # "git -c protocol.version=2 clone ..." and "git -C <mirror> <command> ..." both have the command at index 3
+        commands = [call.args[3] for call in mock_exec.call_args_list]
+        assert commands == ["clone", "worktree", "fetch", "worktree", "worktree"]
+
+        await cache.worktree(second)
+
+    # Only the mirror of the most recently used repository is kept
+    mirrors = list(tmp_path.iterdir())
+    assert len(mirrors) == 1
+    assert mirrors[0].name == hashlib.sha1(second.url.encode()).hexdigest() + ".git"
+
+
+@pytest.mark.asyncio
+async def test_repo_cache_request_during_eviction_clones_new_mirror(tmp_path: Path) -> None:
+    """
+    Test the `RepoCache.worktree` method when a repository is requested again while its mirror is being deleted.
+    Verifies that a new mirror is cloned instead of fetching into the one being deleted.
+    """
+    commands: list[tuple[str, str]] = []
+
+    async def fake_git(*args: str, config: CloneConfig) -> tuple[bytes, bytes]:
+        if "--mirror" in args:
+            Path(args[-1]).mkdir()
+            commands.append(("clone", args[-1]))
+        else:
+            commands.append((args[3], args[2]))
+        return b"", b""
+
+    deleting = threading.Event()
+    release = threading.Event()
+    rmtree = shutil.rmtree
+
+    def slow_rmtree(path: Path, **kwargs) -> None:
+        deleting.set()
+        release.wait(timeout=5)
+        rmtree(path, **kwargs)
+
+    cache = RepoCache(tmp_path, max_repos=1)
+    first = CloneConfig(url="https://github.com/user/first", local_path="/tmp/first")
+    second = CloneConfig(url="https://github.com/user/second", local_path="/tmp/second")
+    first_mirror = str(tmp_path / (hashlib.sha1(first.url.encode()).hexdigest() + ".git"))
+
+    with patch("gitingest.repository_clone._run_git_command", side_effect=fake_git):
+        with patch("shutil.rmtree", side_effect=slow_rmtree):
+            await cache.worktree(first)
+            # Requesting a second repository evicts the first one
+            evicting = asyncio.create_task(cache.worktree(second))
+            await asyncio.to_thread(deleting.wait, 5)
+
+            requesting = asyncio.create_task(cache.worktree(first))
+            await asyncio.sleep(0.05)
+            release.set()
+            await asyncio.gather(evicting, requesting)
+
+    assert [command for command, mirror in commands if mirror == first_mirror] == [
+        "clone",
+        "worktree",
+        "clone",
+        "worktree",
+    ]
+
+
 @pytest.mark.asyncio
 async def test_git_command_failure() -> None:
     """
@@ -178,7 +690,15 @@ async def test_clone_repo_default_shallow_clone() -> None:
         with patch("gitingest.repository_clone._run_git_command", new_callable=AsyncMock) as mock_exec:
             await clone_repo(clone_config)
             mock_exec.assert_called_once_with(
-                "git", "clone", "--depth=1", "--single-branch", clone_config.url, clone_config.local_path
+                "git",
+                "-c",
+                "protocol.version=2",
+                "clone",
+                "--depth=1",
+                "--single-branch",
+                clone_config.url,
+                clone_config.local_path,
+                config=clone_config,
             )
 
 
@@ -196,22 +716,38 @@ async def test_clone_repo_commit_without_branch() -> None:
     with patch("gitingest.repository_clone._check_repo_exists", return_value=True):
         with patch("gitingest.repository_clone._run_git_command", new_callable=AsyncMock) as mock_exec:
             await clone_repo(clone_config)
-            assert mock_exec.call_count == 2  # Clone and checkout calls
-            mock_exec.assert_any_call("git", "clone", "--single-branch", clone_config.url, clone_config.local_path)
-            mock_exec.assert_any_call("git", "-C", clone_config.local_path, "checkout", clone_config.commit)
+
+    # A blobless clone without checkout, then a checkout of the commit, in that order
+    assert mock_exec.call_args_list == [
+        call(
+            "git",
+            "-c",
+            "protocol.version=2",
+            "clone",
+            "--filter=blob:none",
+            "--no-checkout",
+            "--single-branch",
+            clone_config.url,
+            clone_config.local_path,
+            config=clone_config,
+        ),
+        call("git", "-C", clone_config.local_path, "checkout", clone_config.commit, config=clone_config),
+    ]
 
 
 @pytest.mark.asyncio
 async def test_check_repo_exists_with_redirect() -> None:
     """
     Test the `_check_repo_exists` function for handling HTTP redirects (302 Found).
-    Verifies that it correctly identifies the repository's existence.
+    Verifies that the redirect is followed and the status of the final response is used.
     """
     url = "https://github.com/user/repo"
-    with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
-        mock_process = AsyncMock()
-        mock_process.communicate.return_value = (b"HTTP/1.1 302 Found\n", b"")
-        mock_process.returncode = 0  # Simulate successful request
-        mock_exec.return_value = mock_process
 
-        assert await _check_repo_exists(url)
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/user/repo":
+            return httpx.Response(302, headers={"Location": "https://github.com/user/renamed-repo"})
+        return httpx.Response(200)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True) as client:
+        with patch("gitingest.repository_clone._get_http_client", return_value=client):
+            assert await _check_repo_exists(url)
@@ -0,0 +1,103 @@
+""" Tests for the SSE endpoint streaming clone progress. """
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from gitingest.repository_clone import CloneProgress
+from routers.sse import router
+from server_utils import CloneTask
+
+
+@pytest.fixture
+def app() -> FastAPI:
+    """Build an application serving only the SSE router, with an empty task registry."""
+    application = FastAPI()
+    application.include_router(router)
+    application.state.tasks = {}
+    return application
+
+
+def _client(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://localhost")
+
+
+@pytest.mark.asyncio
+async def test_clone_progress_unknown_task(app: FastAPI) -> None:
+    """
+    Test that following an unknown task answers 404 without registering anything.
+    """
+    async with _client(app) as client:
+        response = await client.get("/sse/clone-progress/unknown")
+
+    assert response.status_code == 404
+    assert not app.state.tasks
+
+
+@pytest.mark.asyncio
+async def test_clone_progress_streams_until_finished(app: FastAPI) -> None:
+    """
+    Test that every update of a task is streamed and that the stream ends once the task is finished.
+    """
+    task = app.state.tasks["task"] = CloneTask()
+
+    async def produce() -> None:
+        await asyncio.sleep(0.05)
+        task.update(CloneProgress(phase="克隆中", current=1, total=2))
+        await asyncio.sleep(0.05)
+        task.finish()
+
+    producer = asyncio.create_task(produce())
+    async with _client(app) as client:
+        async with client.stream("GET", "/sse/clone-progress/task") as response:
+            assert response.headers["x-accel-buffering"] == "no"
+            events = [
+                json.loads(line[len("data: ") :]) async for line in response.aiter_lines() if line.startswith("data: ")
+            ]
+    await producer
+
+    assert [(event["phase"], event["current"], event["total"]) for event in events] == [
+        ("克隆中", 1, 2),
+        ("完成", 0, 0),
+    ]
+    assert not app.state.tasks
+
+
+@pytest.mark.asyncio
+async def test_clone_progress_disconnect_removes_task(app: FastAPI) -> None:
+    """
+    Test that a client disconnecting before the task is finished ends the stream and unregisters the task.
+    """
+    app.state.tasks["task"] = CloneTask()
+    messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+
+    async def receive() -> dict:
+        message = next(messages, None)
+        if message is None:
+            await asyncio.sleep(0.05)
+            return {"type": "http.disconnect"}
+        return message
+
+    async def send(message: dict) -> None:
+        pass
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/sse/clone-progress/task",
+        "raw_path": b"/sse/clone-progress/task",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("localhost", 80),
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+
+    assert not app.state.tasks